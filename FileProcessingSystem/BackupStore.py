@@ -0,0 +1,170 @@
+import os, json
+import shutil
+import hashlib
+import logging
+import tempfile
+import threading
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+
+FICLONE = 0x40049409  # Linux ioctl sharing the data blocks of two files (reflink) on btrfs, XFS, ...
+
+
+
+class BackupStore:
+    """
+    Versioned, deduplicated backups.
+
+    The content of every backed up version is stored once in <objects_dir>/<sha256>, and each version
+    of a file is a hard link <name>.<timestamp>.bak to its object; <name>.bak always links the latest
+    version. A manifest per file records the versions, so unchanged files are skipped by comparing
+    size and mtime first and the content hash second. Only the newest `keep` versions are kept (all
+    of them with keep=None), and objects no longer linked by any version are deleted.
+    """
+    _lock = threading.Lock()  # Linking and pruning of shared objects must not interleave
+
+    def __init__(self, backup_dir='backups', keep=5, objects_dir=None):
+        if keep is not None and keep < 1:  # The latest version is always kept, it is linked by <name>.bak
+            raise ValueError("keep should be at least 1, or None to keep every version.")
+        self.backup_dir = backup_dir
+        self.keep = keep
+        self.objects_dir = objects_dir or os.path.join(backup_dir, 'objects')
+        os.makedirs(self.backup_dir, exist_ok=True)
+        os.makedirs(self.objects_dir, exist_ok=True)
+
+    @staticmethod
+    def file_hash(file_path, chunk_size=1024 * 1024):
+        """Returns the sha256 of a file, reading it in chunks."""
+        digest = hashlib.sha256()
+        with open(file_path, 'rb') as file:
+            while chunk := file.read(chunk_size):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    @staticmethod
+    def fast_copy(source, destination):
+        """Copies a file by reflink when supported, else with copy_file_range, else by reading and writing."""
+        with open(source, 'rb') as source_file, open(destination, 'wb') as destination_file:
+            try:
+                if fcntl is None:
+                    raise OSError("Reflinks are not supported on this platform")
+                fcntl.ioctl(destination_file.fileno(), FICLONE, source_file.fileno())
+            except OSError:
+                try:
+                    remaining = os.fstat(source_file.fileno()).st_size
+                    while remaining > 0:
+                        copied = os.copy_file_range(source_file.fileno(), destination_file.fileno(), remaining)
+                        if copied == 0:
+                            break
+                        remaining -= copied
+                except (AttributeError, OSError):
+                    source_file.seek(0)
+                    destination_file.seek(0)
+                    destination_file.truncate()
+                    shutil.copyfileobj(source_file, destination_file, 1024 * 1024)
+        shutil.copystat(source, destination)
+
+    def _manifest_path(self, name):
+        return os.path.join(self.backup_dir, name + '.manifest.json')
+
+    def _load_manifest(self, name):
+        try:
+            with open(self._manifest_path(name), 'r', encoding='utf-8') as file:
+                return json.load(file)
+        except FileNotFoundError:
+            return {"versions": []}
+
+    def _save_manifest(self, name, manifest):
+        temp_path = self._manifest_path(name) + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as file:
+            json.dump(manifest, file, indent=2)
+        os.replace(temp_path, self._manifest_path(name))
+
+    def _copy_object(self, file_path, stat):
+        """Copies the file's content to a temporary file of the object store, returns its path."""
+        fd, temp_path = tempfile.mkstemp(dir=self.objects_dir, suffix='.tmp')
+        os.close(fd)
+        try:
+            self.fast_copy(file_path, temp_path)
+            if os.stat(file_path).st_mtime_ns != stat.st_mtime_ns:  # The copy may not match the hash
+                raise RuntimeError(f"{file_path} changed during the backup.")
+        except BaseException:
+            os.remove(temp_path)
+            raise
+        return temp_path
+
+    @staticmethod
+    def _link(object_path, link_path):
+        """Points link_path at the object, falling back to a copy where hard links are not supported."""
+        temp_path = link_path + '.tmp'
+        if os.path.lexists(temp_path):
+            os.remove(temp_path)
+        try:
+            os.link(object_path, temp_path)
+        except OSError:
+            shutil.copy2(object_path, temp_path)
+        os.replace(temp_path, link_path)
+
+    def backup(self, file_path):
+        """
+        Backs up a file unless it is unchanged since its latest version.
+
+        :return: (True, path of the new version) or (False, path of the latest version)
+        """
+        name = os.path.basename(file_path)
+        manifest = self._load_manifest(name)
+        versions = manifest["versions"]
+        latest = versions[-1] if versions else None
+        stat = os.stat(file_path)
+
+        if latest and os.path.exists(latest["path"]):
+            if latest["size"] == stat.st_size and latest["mtime_ns"] == stat.st_mtime_ns:
+                return False, latest["path"]  # Same size and mtime, the content is not even hashed
+
+        content_hash = self.file_hash(file_path)
+        if latest and latest["hash"] == content_hash and os.path.exists(latest["path"]):
+            latest["mtime_ns"] = stat.st_mtime_ns  # Touched but not modified
+            self._save_manifest(name, manifest)
+            return False, latest["path"]
+
+        # The content is copied outside the lock, unless an identical object already exists. The object is
+        # only stored, checked and linked under the lock, so a concurrent prune can not delete it in between
+        object_path = os.path.join(self.objects_dir, content_hash)
+        temp_path = None if os.path.exists(object_path) else self._copy_object(file_path, stat)
+        timestamp = datetime.now().strftime('%Y%m%d-%H%M%S-%f')
+        version_path = os.path.join(self.backup_dir, f"{name}.{timestamp}.bak")
+        try:
+            with self._lock:
+                if not os.path.exists(object_path):
+                    os.replace(temp_path or self._copy_object(file_path, stat), object_path)
+                    temp_path = None
+                self._link(object_path, version_path)
+                self._link(object_path, os.path.join(self.backup_dir, name + '.bak'))
+
+                versions.append({"hash": content_hash, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns,
+                                 "path": version_path, "created": timestamp})
+                expired = []
+                if self.keep is not None and len(versions) > self.keep:
+                    expired, manifest["versions"] = versions[:-self.keep], versions[-self.keep:]
+                self._save_manifest(name, manifest)
+                self._prune(expired)
+        finally:
+            if temp_path is not None:  # An identical object was stored meanwhile
+                os.remove(temp_path)
+
+        logging.info("Backup version created for file %s: %s", file_path, version_path)
+        return True, version_path
+
+    def _prune(self, expired):
+        """Deletes expired versions, and their objects once no version links them anymore."""
+        for version in expired:
+            if os.path.exists(version["path"]):
+                os.remove(version["path"])
+            object_path = os.path.join(self.objects_dir, version["hash"])
+            if os.path.exists(object_path) and os.stat(object_path).st_nlink == 1:
+                os.remove(object_path)
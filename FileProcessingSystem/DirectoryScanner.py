@@ -0,0 +1,80 @@
+import os
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+
+# Compact record of one file, a plain tuple instead of a Path plus a stat result per file
+FileRecord = namedtuple("FileRecord", ["name", "suffix", "size", "mtime", "path"])
+
+
+
+class DirectoryScanner:
+    """
+    Lists files with os.scandir.
+
+    The entry type comes from the directory listing itself and each file is stat-ed exactly once, while
+    it is listed, so sorting or grouping the records never touches the filesystem again. Recursive scans
+    can list subdirectories in parallel on a pool of worker threads (scandir releases the GIL).
+    Symbolic links to directories are not followed, so a scan can not loop.
+    """
+    def __init__(self, recursive=False, workers=None):
+        """
+        :param recursive: Whether files of subdirectories are listed too
+        :param workers: (Optional) Number of threads listing subdirectories in parallel, sequential otherwise
+        """
+        self.recursive = recursive
+        self.workers = workers
+
+    @staticmethod
+    def record(name, path, stat):
+        """Builds the FileRecord of a file from its stat result."""
+        return FileRecord(name, os.path.splitext(name)[1], stat.st_size, stat.st_mtime, path)
+
+    @staticmethod
+    def scan_directory(directory):
+        """Lists one directory, returns (file records, subdirectory paths)."""
+        records, subdirectories = [], []
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_file():
+                        records.append(DirectoryScanner.record(entry.name, entry.path, entry.stat()))
+                    elif entry.is_dir(follow_symlinks=False):
+                        subdirectories.append(entry.path)
+                except OSError:  # Removed while listing, or a broken link
+                    continue
+        return records, subdirectories
+
+    def _scan_safely(self, directory):
+        try:
+            return self.scan_directory(directory)
+        except OSError:  # A subdirectory that can not be read is skipped, not the whole scan
+            return [], []
+
+    def iter_records(self, directory):
+        """Yields the FileRecord of every file, one directory at a time."""
+        records, subdirectories = self.scan_directory(directory)
+        yield from records
+        if not self.recursive:
+            return
+
+        if not self.workers or self.workers <= 1:
+            pending = subdirectories
+            while pending:
+                records, subdirectories = self._scan_safely(pending.pop())
+                pending.extend(subdirectories)
+                yield from records
+            return
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            running = {executor.submit(self._scan_safely, path) for path in subdirectories}
+            while running:
+                done, running = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    records, subdirectories = future.result()
+                    running.update(executor.submit(self._scan_safely, path) for path in subdirectories)
+                    yield from records
+
+    def scan(self, directory):
+        """Returns the FileRecord of every file."""
+        return list(self.iter_records(directory))
@@ -0,0 +1,134 @@
+import os
+import sqlite3
+from collections import defaultdict
+from DirectoryScanner import DirectoryScanner, FileRecord
+
+
+
+class FileCatalog:
+    """
+    Persistent SQLite catalog of the files of a directory tree.
+
+    Every file is stored with its name, extension, size and mtime, and every directory with the mtime
+    it had when it was listed. A refresh only lists the directories whose mtime changed (a file was
+    created, deleted or renamed in them), so searching, grouping and sorting are answered from the
+    catalog instead of the filesystem. Edits that change a file's size or mtime without touching its
+    directory are picked up by refresh(full=True).
+    """
+    SORT_COLUMNS = {"name": "lower(name)", "type": "lower(extension)", "date": "mtime"}
+
+    def __init__(self, db_path="catalog/file_catalog.db"):
+        if os.path.dirname(db_path):
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self.db_path = db_path
+        self.connection = sqlite3.connect(db_path)
+        self.connection.executescript("""
+            CREATE TABLE IF NOT EXISTS directories (
+                path TEXT PRIMARY KEY, parent TEXT, mtime_ns INTEGER);
+            CREATE TABLE IF NOT EXISTS files (
+                path TEXT PRIMARY KEY, directory TEXT NOT NULL, name TEXT NOT NULL,
+                extension TEXT NOT NULL, size INTEGER, mtime REAL);
+            CREATE INDEX IF NOT EXISTS directories_parent ON directories (parent);
+            CREATE INDEX IF NOT EXISTS files_directory ON files (directory);
+            CREATE INDEX IF NOT EXISTS files_extension ON files (extension);
+        """)
+
+    def close(self):
+        self.connection.close()
+
+    @staticmethod
+    def _scope(root, recursive):
+        """Returns the WHERE clause and parameters selecting the files under root."""
+        if not recursive:
+            return "directory = ?", (root,)
+        prefix = root.rstrip(os.sep) + os.sep
+        return "(directory = ? OR substr(directory, 1, ?) = ?)", (root, len(prefix), prefix)
+
+    def refresh(self, root, recursive=False, full=False):
+        """
+        Brings the catalog of root up to date and returns the number of directories listed again.
+
+        :param recursive: Whether subdirectories are refreshed too
+        :param full: List every directory, even the unchanged ones
+        """
+        root = os.path.abspath(root)
+        pending, rescanned = [(root, None)], 0
+
+        with self.connection:
+            while pending:
+                directory, parent = pending.pop()
+                stored = self.connection.execute("SELECT mtime_ns FROM directories WHERE path = ?",
+                                                 (directory,)).fetchone()
+                try:
+                    mtime_ns = os.stat(directory).st_mtime_ns
+                except OSError:
+                    self._forget(directory)
+                    continue
+
+                if not full and stored and stored[0] == mtime_ns:
+                    subdirectories = [path for path, in self.connection.execute(
+                        "SELECT path FROM directories WHERE parent = ?", (directory,))]
+                else:
+                    subdirectories = self._rescan(directory, parent, mtime_ns)
+                    rescanned += 1
+
+                if recursive:
+                    pending.extend((path, directory) for path in subdirectories)
+        return rescanned
+
+    def _rescan(self, directory, parent, mtime_ns):
+        """Lists a directory and replaces its files and subdirectories in the catalog."""
+        records, subdirectories = DirectoryScanner.scan_directory(directory)
+
+        self.connection.execute("DELETE FROM files WHERE directory = ?", (directory,))
+        self.connection.executemany(
+            "INSERT OR REPLACE INTO files (path, directory, name, extension, size, mtime) VALUES (?, ?, ?, ?, ?, ?)",
+            ((record.path, directory, record.name, record.suffix, record.size, record.mtime) for record in records))
+
+        known = {path for path, in self.connection.execute("SELECT path FROM directories WHERE parent = ?",
+                                                           (directory,))}
+        for path in known - set(subdirectories):
+            self._forget(path)
+        self.connection.executemany(  # New subdirectories are listed the first time they are refreshed
+            "INSERT OR IGNORE INTO directories (path, parent, mtime_ns) VALUES (?, ?, NULL)",
+            ((path, directory) for path in subdirectories))
+        self.connection.execute(
+            "INSERT INTO directories (path, parent, mtime_ns) VALUES (?, ?, ?) "
+            "ON CONFLICT (path) DO UPDATE SET mtime_ns = excluded.mtime_ns",
+            (directory, parent, mtime_ns))
+        return subdirectories
+
+    def _forget(self, directory):
+        """Removes a deleted directory, its subdirectories and their files from the catalog."""
+        where, parameters = self._scope(directory, recursive=True)
+        self.connection.execute(f"DELETE FROM files WHERE {where}", parameters)
+        self.connection.execute(f"DELETE FROM directories WHERE {where.replace('directory', 'path')}", parameters)
+
+    def records(self, root, recursive=False, sort_by=None, reverse=False):
+        """
+        Returns the FileRecords under root.
+
+        :param sort_by: (Optional) "name", "type" or "date"
+        """
+        where, parameters = self._scope(os.path.abspath(root), recursive)
+        query = f"SELECT name, extension, size, mtime, path FROM files WHERE {where}"
+        if sort_by is not None:
+            if sort_by not in self.SORT_COLUMNS:
+                raise ValueError(f"Invalid sort option '{sort_by}'.")
+            query += f" ORDER BY {self.SORT_COLUMNS[sort_by]} {'DESC' if reverse else 'ASC'}"
+        return [FileRecord(*row) for row in self.connection.execute(query, parameters)]
+
+    def search(self, root, substring, recursive=False):
+        """Returns the names of files under root containing the substring (case sensitive)."""
+        where, parameters = self._scope(os.path.abspath(root), recursive)
+        return [name for name, in self.connection.execute(
+            f"SELECT name FROM files WHERE {where} AND instr(name, ?) > 0", parameters + (substring,))]
+
+    def categories(self, root, recursive=False):
+        """Returns {extension without the dot: file names}, files without an extension are grouped under ''."""
+        where, parameters = self._scope(os.path.abspath(root), recursive)
+        groups = defaultdict(list)
+        for extension, name in self.connection.execute(
+                f"SELECT extension, name FROM files WHERE {where} ORDER BY extension", parameters):
+            groups[extension.lstrip('.')].append(name)
+        return groups
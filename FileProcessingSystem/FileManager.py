@@ -1,17 +1,38 @@
 import os, csv, json
+import re
+import copy
 import shutil
 import logging
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from BackupStore import BackupStore
+from QueueLogging import setup_logging
+from RecordCache import RecordCache
+from RecordIndex import RecordIndex
+from RecordValidator import RecordValidator
+
+
+# Characters a JSON number can end with when a chunk boundary cuts it
+NUMBER_TAIL = re.compile(r"[0-9.eE+-]*")
+
+
+class UnsupportedFormatError(ValueError):
+    """Raised when a file is neither CSV nor JSON."""
 
 
 
 class FileManager:
-    def __init__(self, file_path):
+    # Shared by all instances, so every FileManager over the same file reuses its parsed records
+    record_cache = RecordCache()
+
+    def __init__(self, file_path, indexed=False):
+        """
+        :param file_path: Path of the file to manage
+        :param indexed: If True, filters and queries use indexes built once per file version instead of scans
+        """
         self.file_path = file_path
-        logging.basicConfig(
-            filename="logs/file_operations.log",
-            level=logging.INFO,
-            format="%(asctime)s - %(levelname)s - %(message)s",
-        )
+        self.indexed = indexed
+        setup_logging("logs/file_operations.log")  # Written by a background thread, once per process
 
     def validate_file(self):
         """Check if the file exists and is accessible."""
@@ -21,160 +42,467 @@ class FileManager:
         """Read the content of a text file."""
         try:
             if not self.validate_file():
-                logging.error(f"File not found: {self.file_path}")
+                logging.error("File not found: %s", self.file_path)
                 raise FileNotFoundError("File does not exist.")
 
             with open(self.file_path, 'r', encoding='utf-8') as file:
-                logging.info(f"File read successfully: {self.file_path}")
+                logging.info("File read successfully: %s", self.file_path)
                 return '\n' + file.read()
         except Exception as e:
-            logging.exception(f"Error reading file: {self.file_path}")
+            logging.exception("Error reading file: %s", self.file_path)
             return f"Error reading file: {e}"
 
     def write_file(self, data, mode='w'):
         """Write data to a text file."""
         try:
             with open(self.file_path, mode, encoding='utf-8') as file:
-                logging.info(f"File written successfully: {self.file_path}")
+                logging.info("File written successfully: %s", self.file_path)
                 file.write(data)
+            self.record_cache.invalidate(self.file_path)
             return "Write operation successful."
         except Exception as e:
-            logging.exception(f"Error writing to file {self.file_path}: {e}")
+            logging.exception("Error writing to file %s: %s", self.file_path, e)
             return f"Error writing to file: {e}"
 
     def append_to_file(self, data):
         """Append data to a new line in a text file."""
         return self.write_file('\n' + data, mode='a')
 
-    def create_backup(self, backup_dir='backups'):
-        """Create a backup of the file."""
+    def create_backup(self, backup_dir='backups', incremental=False, keep=5, objects_dir=None):
+        """
+        Create a backup of the file.
+
+        :param incremental: (Optional) Keep versioned, deduplicated backups and skip the file if it is unchanged
+        :param keep: Number of versions kept by incremental backups (at least 1), None to keep every version
+        :param objects_dir: (Optional) Directory of the content-addressed objects, <backup_dir>/objects by default
+        """
         try:
             if not self.validate_file():
-                logging.exception(f"File {self.file_path} does not exist, backup failed")
+                logging.exception("File %s does not exist, backup failed", self.file_path)
                 raise FileNotFoundError("File does not exist. Backup failed.")
 
+            if incremental:
+                created, backup_path = BackupStore(backup_dir, keep, objects_dir).backup(self.file_path)
+                if not created:
+                    logging.info("Backup skipped for unchanged file %s", self.file_path)
+                    return f"Backup unchanged at {backup_path}"
+                return f"Backup created at {backup_path}"
+
             if not os.path.exists(backup_dir):
                 os.makedirs(backup_dir)
 
             backup_path = os.path.join(backup_dir, os.path.basename(self.file_path) + '.bak')
             shutil.copy2(self.file_path, backup_path)
-            logging.info(f"Backup created successfully for file {self.file_path}")
+            logging.info("Backup created successfully for file %s", self.file_path)
             return f"Backup created at {backup_path}"
         except Exception as e:
             return f"Error creating backup: {e}"
 
+    @classmethod
+    def backup_directory(cls, directory, backup_dir='backups', keep=5, workers=4):
+        """
+        Incrementally backs up every file of a directory tree in parallel.
+
+        The tree is mirrored under backup_dir and all files share one object store, so identical
+        files are stored once.
+        :return: {file path: result of create_backup}
+        """
+        objects_dir = os.path.join(backup_dir, 'objects')
+        skipped_dir = os.path.abspath(backup_dir)
+        jobs = []
+        for root, dirs, files in os.walk(directory):
+            dirs[:] = [name for name in dirs if os.path.abspath(os.path.join(root, name)) != skipped_dir]
+            target_dir = os.path.join(backup_dir, os.path.relpath(root, directory))
+            jobs.extend((os.path.join(root, name), os.path.normpath(target_dir)) for name in files)
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = executor.map(lambda job: cls(job[0]).create_backup(job[1], incremental=True, keep=keep,
+                                                                         objects_dir=objects_dir), jobs)
+            return {file_path: result for (file_path, _), result in zip(jobs, results)}
+
     def parse_file(self):
         """Reads a CSV or JSON file and returns structured data."""
         try:
-            if not self.validate_file():
-                logging.exception('File not found while parsing')
-                raise FileNotFoundError("File does not exist.")
+            if self._is_json_document():
+                data = self._load_json()  # Not an array of records, returned as json.load returns it
+            else:
+                data = self._copy_records(self.records())
+            logging.info("File parsed successfully %s", self.file_path)
+            return data
+        except UnsupportedFormatError as e:
+            logging.exception("Unsupported file extension: %s", e)
+            return "Unsupported file format. Only CSV and JSON are allowed."
+        except Exception as e:
+            logging.exception("File parsing failed for file %s", self.file_path)
+            return f"Error parsing file: {e}"
 
-            file_extension = os.path.splitext(self.file_path)[-1].lower()
+    def _is_json_document(self):
+        """Checks whether the file is a .json file whose top-level value is not an array."""
+        return (self.validate_file() and os.path.splitext(self.file_path)[-1].lower() == ".json"
+                and not self._is_json_array())
 
-            with open(self.file_path, 'r', encoding='utf-8') as file:
-                if file_extension == ".csv":
-                    reader = csv.DictReader(file)
-                    data = [row for row in reader]
-                    # Converting files to integer (In this case "Age"), since csv only supports strings
-                    for item in data:
-                        if "Age" in item:
-                            try:
-                                item["Age"] = int(item["Age"])  # Convert Age to int
-                            except ValueError:
-                                item["Age"] = None  # Handle invalid numbers
-                    logging.info(f"File parsed successfully {self.file_path}")
-                    return data
-
-                elif file_extension == ".json":
-                    logging.info(f"File parsed successfully {self.file_path}")
-                    return json.load(file)  # Load JSON file as list of dictionaries
+    def records(self):
+        """
+        Returns the records of the file, parsing it only if it changed since it was last parsed.
+
+        Files too large for the record cache are streamed with iter_records instead. Cached records
+        are shared between calls and must not be modified, the public methods hand out copies of them.
+        """
+        if not self.validate_file() or not self.record_cache.fits(self.file_path):
+            return self.iter_records()
+
+        signature = RecordCache.signature(self.file_path)
+        records = self.record_cache.get(self.file_path, signature)
+        if records is None:
+            records = list(self.iter_records())
+            self.record_cache.put(self.file_path, signature, records)
+        return records
+
+    @staticmethod
+    def _copy_records(records):
+        """Copies records for callers, so changes made to them never reach the shared record cache."""
+        return [{field: copy.deepcopy(value) if isinstance(value, (dict, list)) else value
+                 for field, value in record.items()} if isinstance(record, dict) else copy.deepcopy(record)
+                for record in records]
+
+    def index(self):
+        """Returns the RecordIndex of the current file version, building it only if the file changed."""
+        signature = RecordCache.signature(self.file_path)
+        index = self.record_cache.get(self.file_path, signature, kind="index")
+        if index is None:
+            records = self.records()
+            index = RecordIndex(records if isinstance(records, list) else list(records))
+            # Fully built indexes take roughly as much memory as the records again
+            self.record_cache.put(self.file_path, signature, index, kind="index",
+                                  size=RecordCache.estimate_size(index.records))
+        return index
+
+    def query(self, equals=None, ranges=None, contains=None):
+        """
+        Returns the records matching every given predicate.
+
+        :param equals: (Optional) {field: value} exact matches
+        :param ranges: (Optional) {field: (min_value, max_value)} numeric ranges, either bound may be None
+        :param contains: (Optional) {field: substring} case-insensitive substring matches
+        """
+        if self.indexed:
+            return self._copy_records(self.index().query(equals, ranges, contains))
+
+        return self._copy_records(
+            item for item in self.records()
+            if all(item.get(field) == value for field, value in (equals or {}).items())
+            and all(self._in_range(item, field, *bounds) for field, bounds in (ranges or {}).items())
+            and all(self._contains(item, field, substring) for field, substring in (contains or {}).items())
+        )
+
+    @staticmethod
+    def _in_range(item, field, min_value=None, max_value=None):
+        return (field in item and isinstance(item[field], (int, float)) and
+                (min_value is None or item[field] >= min_value) and (max_value is None or item[field] <= max_value))
+
+    @staticmethod
+    def _contains(item, field, substring):
+        return field in item and isinstance(item[field], str) and substring.lower() in item[field].lower()
+
+    def iter_records(self):
+        """
+        Streams the records of a CSV, JSON array (.json) or JSON-lines (.jsonl) file one at a time.
+
+        Only the current record is kept in memory, so files larger than memory can be processed.
+        Raises FileNotFoundError or UnsupportedFormatError instead of returning error messages, and
+        ValueError for a .json file whose top-level value is not an array.
+        """
+        if not self.validate_file():
+            logging.exception('File not found while parsing')
+            raise FileNotFoundError("File does not exist.")
+
+        file_extension = os.path.splitext(self.file_path)[-1].lower()
+        if file_extension not in (".csv", ".json", ".jsonl"):
+            raise UnsupportedFormatError(file_extension)
+
+        with open(self.file_path, 'r', encoding='utf-8', newline='' if file_extension == ".csv" else None) as file:
+            if file_extension == ".csv":
+                for row in csv.DictReader(file):
+                    yield self._coerce_row(row)
+            elif file_extension == ".jsonl":
+                yield from self._iter_json_lines(file)
+            else:
+                yield from self._iter_json(file)
+
+    @staticmethod
+    def _coerce_row(row):
+        """Converts the fields of a CSV row that are not strings (in this case "Age"), since csv only supports strings"""
+        if "Age" in row:
+            try:
+                row["Age"] = int(row["Age"])  # Convert Age to int
+            except (TypeError, ValueError):
+                row["Age"] = None  # Handle invalid numbers
+        return row
+
+    @staticmethod
+    def _iter_json_lines(file):
+        """Yields one JSON value per non-empty line."""
+        for line in file:
+            if line.strip():
+                yield json.loads(line)
+
+    def _is_json_array(self, chunk_size=64 * 1024):
+        """Checks whether a .json file holds a top-level array, the only JSON content that is streamed."""
+        with open(self.file_path, 'r', encoding='utf-8') as file:
+            while chunk := file.read(chunk_size):
+                stripped = chunk.lstrip()
+                if stripped:
+                    return stripped[0] == "["
+        return False
+
+    def _load_json(self):
+        """Loads a whole .json file, whatever its top-level value."""
+        with open(self.file_path, 'r', encoding='utf-8') as file:
+            return json.load(file)
+
+    @classmethod
+    def _iter_json(cls, file, chunk_size=1024 * 1024):
+        """Yields the items of a top-level JSON array without loading the whole array."""
+        buffer = file.read(chunk_size)
+        while buffer.isspace():
+            chunk = file.read(chunk_size)
+            if not chunk:
+                break
+            buffer += chunk
+        stripped = buffer.lstrip()
+
+        if not stripped.startswith("["):
+            raise ValueError("Data should be a list of dictionaries.")
+
+        decoder = json.JSONDecoder()
+        position = len(buffer) - len(stripped) + 1
+        end_of_file = False
+        expecting = "first"  # After "[": an item or "]", after ",": an item, after an item: "," or "]"
+
+        while True:
+            while position < len(buffer) and buffer[position] in " \t\r\n":
+                position += 1
+
+            if position < len(buffer):
+                char = buffer[position]
+                if expecting == "separator":
+                    if char == ",":
+                        expecting, position = "item", position + 1
+                        continue
+                    if char != "]":
+                        raise json.JSONDecodeError("Expecting ',' delimiter", buffer, position)
+                if char == "]":
+                    if expecting == "item":  # Trailing comma
+                        raise json.JSONDecodeError("Expecting value", buffer, position)
+                    cls._check_end(buffer, position + 1, file, chunk_size)
+                    return
+                if char == ",":
+                    raise json.JSONDecodeError("Expecting value", buffer, position)
+                try:
+                    item, end = decoder.raw_decode(buffer, position)
+                except json.JSONDecodeError:
+                    if end_of_file:
+                        raise
                 else:
-                    logging.exception(f"Unsupported file extension: {file_extension}")
-                    return "Unsupported file format. Only CSV and JSON are allowed."
-        except Exception as e:
-            logging.exception(f"File parsing failed for file {self.file_path}")
-            return f"Error parsing file: {e}"
+                    if end_of_file or cls._is_complete(buffer, end):
+                        yield item
+                        position, expecting = end, "separator"
+                        continue
+            elif end_of_file:
+                raise json.JSONDecodeError("Unterminated JSON array", buffer, position)
+
+            # Read at least as much as is buffered, so items larger than a chunk are re-parsed only a few times
+            chunk = file.read(max(chunk_size, len(buffer) - position))
+            end_of_file = not chunk
+            buffer, position = buffer[position:] + chunk, 0
+
+    @staticmethod
+    def _is_complete(buffer, end):
+        """
+        Checks whether the value decoded up to `end` can not continue in the next chunk: something other
+        than whitespace follows it, and it is not a number cut at the end of the buffer (e.g. "1." of "1.5").
+        """
+        rest = buffer[end:]
+        if not rest.strip():
+            return False
+        return not (NUMBER_TAIL.fullmatch(rest) and buffer[end - 1] in "0123456789.eE+-")
+
+    @staticmethod
+    def _check_end(buffer, position, file, chunk_size):
+        """Raises if anything but whitespace follows the end of the JSON array, as json.load does."""
+        while True:
+            rest = buffer[position:]
+            if rest.strip():
+                offset = position + len(rest) - len(rest.lstrip())
+                raise json.JSONDecodeError("Extra data", buffer, offset)
+            buffer, position = file.read(chunk_size), 0
+            if not buffer:
+                return
 
-    def manipulate_text(self, operation, *args):
-        """Perform string manipulations on the text file."""
+    def manipulate_text(self, operation, *args, chunk_size=1024 * 1024):
+        """
+        Perform string manipulations on the text file.
+
+        The file is processed chunk by chunk, so memory use does not depend on its size, and the result
+        is written to a temporary file that replaces the original only once it is complete.
+        """
         try:
             if not self.validate_file():
                 raise FileNotFoundError("File does not exist.")
 
-            with open(self.file_path, 'r', encoding='utf-8') as file:
-                text = file.read()
+            chunks = self._read_chunks(chunk_size)
 
             if operation == "uppercase":
-                text = text.upper()
+                pieces = (chunk.upper() for chunk in chunks)
             elif operation == "lowercase":
-                text = text.lower()
+                pieces = (chunk.lower() for chunk in chunks)
             elif operation == "replace":
                 old, new = args
-                text = text.replace(old, new)
+                pieces = self._replace_chunks(chunks, old, new)
             elif operation == "strip_spaces":
-                text = " ".join(text.split())  # Removes extra spaces and newlines
+                pieces = self._strip_spaces_chunks(chunks)  # Removes extra spaces and newlines
             elif operation == "count_word":
-                word = args[0]
-                return text.lower().split().count(word.lower())  # Case-insensitive count
+                word = args[0].lower()
+                # Case-insensitive count
+                return sum(1 for token in self._iter_words(chunks) if token.lower() == word)
             else:
                 return "Invalid operation."
 
             # Write the manipulated text back to the file
-            with open(self.file_path, 'w', encoding='utf-8') as file:
-                file.write(text)
+            self._replace_file(pieces)
+            self.record_cache.invalidate(self.file_path)
 
             return "Successful."
         except Exception as e:
             return f"Error manipulating text: {e}"
 
-    def validate_data(self, required_fields=None, data_types=None):
-        """Validates data against required fields and data types."""
-        data = self.parse_file()
+    def _read_chunks(self, chunk_size):
+        """Yields the text of the file in chunks of chunk_size characters."""
+        with open(self.file_path, 'r', encoding='utf-8') as file:
+            while chunk := file.read(chunk_size):
+                yield chunk
+
+    def _replace_file(self, pieces):
+        """Writes the pieces to a temporary file next to the file, then atomically renames it over the file."""
+        directory = os.path.dirname(os.path.abspath(self.file_path))
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".", suffix=".tmp")
         try:
-            if not isinstance(data, list):
-                raise ValueError("Data should be a list of dictionaries.")
-
-            for item in data:
-                if not isinstance(item, dict):
-                    raise ValueError("Each item in data should be a dictionary.")
-
-                if required_fields:
-                    missing_fields = [field for field in required_fields if field not in item]
-                    if missing_fields:
-                        return f"Missing required fields: {missing_fields}"
-
-                if data_types:
-                    for field, expected_type in data_types.items():
-                        if field in item:
-                            actual_type = type(item[field])
-                            if actual_type is not expected_type:
-                                return (f"Field '{field}' should be of type {expected_type.__name__}, "
-                                        f"but got {actual_type.__name__}")
+            with os.fdopen(fd, 'w', encoding='utf-8') as temp_file:
+                temp_file.writelines(pieces)
+                temp_file.flush()
+                os.fsync(temp_file.fileno())
+            shutil.copymode(self.file_path, temp_path)
+            os.replace(temp_path, self.file_path)
+        except BaseException:
+            os.remove(temp_path)
+            raise
 
-            return "Data validation successful."
+    @staticmethod
+    def _replace_chunks(chunks, old, new):
+        """Replaces old with new like str.replace, including occurrences spanning two chunks."""
+        if not old:
+            raise ValueError("Text to replace must not be empty.")
+
+        carry = ""
+        for chunk in chunks:
+            buffer = carry + chunk
+            # Any occurrence starting before cut ends inside the buffer, later ones may continue in the next chunk
+            cut = len(buffer) - len(old) + 1
+            position = 0
+            pieces = []
+
+            index = buffer.find(old, position)
+            while index != -1 and index < cut:
+                pieces.append(buffer[position:index])
+                pieces.append(new)
+                position = index + len(old)
+                index = buffer.find(old, position)
+
+            cut = max(cut, position)
+            pieces.append(buffer[position:cut])
+            carry = buffer[cut:]
+            yield "".join(pieces)
+
+        yield carry
+
+    @staticmethod
+    def _iter_words(chunks):
+        """Yields the whitespace-separated words of the text, including words spanning two chunks."""
+        partial = ""
+        for chunk in chunks:
+            words = (partial + chunk).split()
+            # The last word may continue in the next chunk unless the chunk ends with whitespace
+            partial = words.pop() if words and not chunk[-1].isspace() else ""
+            yield from words
+        if partial:
+            yield partial
+
+    @classmethod
+    def _strip_spaces_chunks(cls, chunks):
+        """Yields the text with every run of whitespace replaced by one space and no leading/trailing spaces."""
+        separator = ""
+        for word in cls._iter_words(chunks):
+            yield separator + word
+            separator = " "
+
+    def validate_data(self, required_fields=None, data_types=None, report=False, processes=None, sample_size=5):
+        """
+        Validates data against required fields and data types.
+
+        By default validation stops at the first failing record and its first error is returned as a
+        message. With report=True every record is checked in one pass and a report is always returned: row
+        counts, the count of every error, the first error and sample rows. When the data can not be read,
+        the report is invalid and its first_error holds the error message.
+
+        :param processes: (Optional) Number of worker processes validating chunks of records in parallel (report=True)
+        :param sample_size: Number of failing rows kept as samples in the report
+        """
+        validator = RecordValidator(required_fields, data_types, sample_size)
+        try:
+            if not report:
+                first_error = validator.first_error(self.records())
+            elif processes:
+                result = validator.validate_parallel(self.records(), processes)
+            else:
+                result = validator.validate(self.records())
+        except UnsupportedFormatError:
+            return self._validation_error("Data should be a list of dictionaries.", validator, report)
         except Exception as e:
-            return f"Error validating data: {e}"
+            return self._validation_error(e, validator, report)
+
+        if report:
+            return result
+        if first_error is None:
+            return "Data validation successful."
+        if first_error == "Each item in data should be a dictionary.":
+            return f"Error validating data: {first_error}"
+        return first_error
+
+    @staticmethod
+    def _validation_error(error, validator, report):
+        """The message of an error reading the data, or an invalid report holding it."""
+        message = f"Error validating data: {error}"
+        if not report:
+            return message
+        result = validator.empty_report()
+        result.update(valid=False, first_error=message)
+        return result
 
     def filter_data(self, field, value):
         """Filter data based on an exact match."""
-        data = self.parse_file()
-        return [item for item in data if item.get(field) == value]
+        if self.indexed:
+            return self.query(equals={field: value})
+        return self._copy_records(item for item in self.records() if item.get(field) == value)
 
     def filter_data_range(self, field, min_value=None, max_value=None):
         """Filter data based on a numeric range."""
-        data = self.parse_file()
-        filtered_data = []
-
-        for item in data:
-            if field in item and isinstance(item[field], (int, float)):
-                if (min_value is None or item[field] >= min_value) and (max_value is None or item[field] <= max_value):
-                    filtered_data.append(item)
-
-        return filtered_data
+        if self.indexed:
+            return self.query(ranges={field: (min_value, max_value)})
+        return self._copy_records(item for item in self.records()
+                                  if self._in_range(item, field, min_value, max_value))
 
     def filter_data_contains(self, field, substring):
         """Filter data where a field contains a substring (case insensitive)."""
-        data = self.parse_file()
-        return [item for item in data if field in item and
-                isinstance(item[field], str) and substring.lower() in item[field].lower()]
+        if self.indexed:
+            return self.query(contains={field: substring})
+        return self._copy_records(item for item in self.records() if self._contains(item, field, substring))
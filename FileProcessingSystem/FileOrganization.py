@@ -1,33 +1,72 @@
 from collections import defaultdict
+import os
 from pathlib import Path
 import logging
+from QueueLogging import setup_logging
+from DirectoryScanner import DirectoryScanner
+from FileCatalog import FileCatalog
+from FileWatcher import FileWatcher
 
 
 
 class FileOrganization:
-    def __init__(self, directory):
+    def __init__(self, directory, recursive=False, workers=None, catalog=None, watch=False):
+        """
+        :param directory: Directory to organize
+        :param recursive: (Optional) Whether files of subdirectories are included
+        :param workers: (Optional) Number of threads listing subdirectories in parallel
+        :param catalog: (Optional) FileCatalog, or path of its database, answering listings, searches and
+                        grouping from a persistent index refreshed incrementally instead of listing the directory
+        :param watch: (Optional) Keep a live in-memory model of the directory, updated from filesystem events
+                      between calls instead of listing the directory on every call
+        """
         self.directory = directory
-        logging.basicConfig(
-            filename="logs/file_operations.log",
-            level=logging.INFO,
-            format="%(asctime)s - %(levelname)s - %(message)s",
-        )
+        self.scanner = DirectoryScanner(recursive, workers)
+        self.catalog = FileCatalog(catalog) if isinstance(catalog, str) else catalog
+        self.watcher = FileWatcher(directory, recursive) if watch and os.path.isdir(directory) else None
+        setup_logging("logs/file_operations.log")  # Written by a background thread, once per process
 
-    def list_files(self):
-        """Lists all files in the given directory."""
+    def list_records(self, sort_by=None, reverse=False):
+        """
+        Lists all files in the given directory as FileRecords (name, suffix, size, mtime, path).
+
+        :param sort_by: (Optional) "name", "type" or "date", used by the catalog to return sorted records
+        """
         try:
-            dir_path = Path(self.directory)
-            if not dir_path.exists() or not dir_path.is_dir():
-                logging.error(f"Listing files failed, directory doesn't exist: {self.directory}")
+            if not os.path.isdir(self.directory):
+                logging.error("Listing files failed, directory doesn't exist: %s", self.directory)
                 return f"Directory '{self.directory}' does not exist."
 
-            files = [f for f in dir_path.iterdir() if f.is_file()]
-            return files if files else "No files found in the directory."
+            if self.watcher is not None:
+                self.watcher.sync()
+                records = self.watcher.records(sort_by, reverse)
+            elif self.catalog is not None:
+                self.catalog.refresh(self.directory, self.scanner.recursive)
+                records = self.catalog.records(self.directory, self.scanner.recursive, sort_by, reverse)
+            else:
+                records = self.scanner.scan(self.directory)
+            return records if records else "No files found in the directory."
 
         except Exception as e:
-            logging.exception(f"Error listing files in: {self.directory}")
+            logging.exception("Error listing files in: %s", self.directory)
             return f"Error listing files: {e}"
 
+    def _refresh_index(self):
+        """Brings the watcher model or the catalog up to date, returns an error message if the directory is missing."""
+        if not os.path.isdir(self.directory):
+            return f"Directory '{self.directory}' does not exist."
+        if self.watcher is not None:
+            self.watcher.sync()
+        else:
+            self.catalog.refresh(self.directory, self.scanner.recursive)
+
+    def list_files(self):
+        """Lists all files in the given directory."""
+        records = self.list_records()
+        if isinstance(records, str):  # If an error message is returned
+            return records
+        return [Path(record.path) for record in records]
+
     def list_and_sort_files(self, sort_by="name", reverse=False):
         """Lists and sorts files in a directory.
         Args:
@@ -35,45 +74,58 @@ class FileOrganization:
             reverse (bool): If True, sorts in descending order. Default is False (ascending).
         """
         try:
-            files = self.list_files()
+            if sort_by not in FileCatalog.SORT_COLUMNS:
+                logging.error("Invalid sort option '%s' used in: %s", sort_by, self.directory)
+                return f"Invalid sort option. Use 'name', 'type', or 'date'."
+
+            files = self.list_records(sort_by, reverse)
             if isinstance(files, str):  # If an error message is returned
-                logging.error(f"Files sorting failed in: {self.directory}")
+                logging.error("Files sorting failed in: %s", self.directory)
                 return files
 
-            if sort_by == "name":
+            if self.watcher is not None or self.catalog is not None:  # Already sorted by the model or catalog
+                sorted_files = files
+            elif sort_by == "name":
                 sorted_files = sorted(files, key=lambda f: f.name.lower(), reverse=reverse)
             elif sort_by == "type":
                 sorted_files = sorted(files, key=lambda f: f.suffix.lower(), reverse=reverse)
-            elif sort_by == "date":
-                sorted_files = sorted(files, key=lambda f: f.stat().st_mtime, reverse=reverse)
             else:
-                logging.error(f"Invalid sort option '{sort_by}' used in: {self.directory}")
-                return f"Invalid sort option. Use 'name', 'type', or 'date'."
+                sorted_files = sorted(files, key=lambda f: f.mtime, reverse=reverse)
 
-            logging.info(f"Files successfully sorted by {sort_by} in: {self.directory}")
+            logging.info("Files successfully sorted by %s in: %s", sort_by, self.directory)
             return [f.name for f in sorted_files]
 
         except Exception as e:
-            logging.exception(f"Error sorting files in: {self.directory}")
+            logging.exception("Error sorting files in: %s", self.directory)
             return f"Error sorting files: {e}"
 
     def file_categories(self):
         """ Groups files by their extension """
         try:
-            files = self.list_files()
+            if self.watcher is None and self.catalog is None:
+                files = self.list_records()
+            else:  # Answered by the watcher model or the catalog, without building every record
+                files = self._refresh_index()
             if isinstance(files, str):  # If an error message is returned
-                logging.error(f"Files grouping failed in: {self.directory} directory")
+                logging.error("Files grouping failed in: %s directory", self.directory)
                 return f"Files grouping failed in: {self.directory} directory"
 
-            file_groups = defaultdict(list)
-            for file in files:
-                name, extension = file.name.split('.')
-                file_groups[extension].append(file.name)
+            if self.watcher is not None:
+                file_groups = self.watcher.categories()
+            elif self.catalog is not None:
+                file_groups = self.catalog.categories(self.directory, self.scanner.recursive)
+            else:
+                file_groups = defaultdict(list)
+                for file in files:  # Files without an extension are grouped under ''
+                    file_groups[file.suffix.lstrip('.')].append(file.name)
+            if not file_groups:  # Like an empty listing
+                logging.error("Files grouping failed in: %s directory", self.directory)
+                return f"Files grouping failed in: {self.directory} directory"
 
-            logging.info(f"Files grouped successfully: {self.directory} directory")
+            logging.info("Files grouped successfully: %s directory", self.directory)
             return file_groups
         except Exception as e:
-            logging.exception(f"File grouping failed at: {self.directory} directory")
+            logging.exception("File grouping failed at: %s directory", self.directory)
             return f"Error grouping files: {e}"
 
     def search_files(self, searched_file):
@@ -81,13 +133,22 @@ class FileOrganization:
             Args: searched_file: file user trying to search for
         """
         try:
-            files = self.list_files()
+            if self.watcher is None and self.catalog is None:
+                files = self.list_records()
+            else:  # Answered by the watcher model or the catalog, without building every record
+                files = self._refresh_index()
             if type(files) == str:
-                logging.error(f"Files searching failed in: {self.directory} directory")
+                logging.error("Files searching failed in: %s directory", self.directory)
                 return f"Files searching failed in: {self.directory} directory"
 
-            logging.info(f"Searching files successful: {self.directory} directory")
-            return [file_name.name for file_name in files if searched_file in file_name.name]
+            if self.watcher is not None:
+                matches = self.watcher.search(searched_file)
+            elif self.catalog is not None:
+                matches = self.catalog.search(self.directory, searched_file, self.scanner.recursive)
+            else:
+                matches = [file_name.name for file_name in files if searched_file in file_name.name]
+            logging.info("Searching files successful: %s directory", self.directory)
+            return matches
         except Exception as e:
-            logging.exception(f"Searching files failed: {self.directory} directory")
+            logging.exception("Searching files failed: %s directory", self.directory)
             return f"Error searching files: {e}"
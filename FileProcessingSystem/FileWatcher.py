@@ -0,0 +1,316 @@
+import os
+import struct
+import ctypes
+import ctypes.util
+import logging
+from bisect import bisect_left, insort
+from collections import defaultdict, OrderedDict
+from DirectoryScanner import DirectoryScanner
+
+
+# inotify(7) constants
+IN_MODIFY = 0x2
+IN_ATTRIB = 0x4
+IN_CLOSE_WRITE = 0x8
+IN_MOVED_FROM = 0x40
+IN_MOVED_TO = 0x80
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_DELETE_SELF = 0x400
+IN_MOVE_SELF = 0x800
+IN_Q_OVERFLOW = 0x4000
+IN_IGNORED = 0x8000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO |
+              IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF)
+EVENT_HEADER = struct.Struct("iIII")  # wd, mask, cookie, length of the name
+
+
+
+class Inotify:
+    """Minimal ctypes binding of Linux inotify, read without blocking."""
+    def __init__(self):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self._rm_watch = libc.inotify_rm_watch
+        self._rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+    def add_watch(self, path, mask=WATCH_MASK):
+        wd = self._add_watch(self.fd, os.fsencode(path), mask)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {path}")
+        return wd
+
+    def rm_watch(self, wd):
+        self._rm_watch(self.fd, wd)
+
+    def read_events(self):
+        """Returns the pending (wd, mask, name) events, an empty list when there are none."""
+        events = []
+        while True:
+            try:
+                buffer = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                return events
+            offset = 0
+            while offset < len(buffer):
+                wd, mask, _, length = EVENT_HEADER.unpack_from(buffer, offset)
+                offset += EVENT_HEADER.size
+                name = os.fsdecode(buffer[offset:offset + length].rstrip(b"\0"))
+                offset += length
+                events.append((wd, mask, name))
+
+    def close(self):
+        os.close(self.fd)
+
+
+
+class FileWatcher:
+    """
+    Live in-memory model of the files of a directory.
+
+    The directory is listed once, then kept up to date from inotify events (Linux), or, where inotify
+    is not available (or can not watch a directory, e.g. when out of watches), by listing again only
+    the directories whose mtime changed since the last sync.
+    Extension groups, sorted orders and recent search results are maintained incrementally, so
+    between two syncs the work done is proportional to the number of changes, not to the number of
+    files. With polling, an edit that does not create, delete or rename a file is not seen until its
+    directory changes.
+    """
+    SORT_KEYS = {
+        "name": lambda record: (record.name.lower(), record.path),
+        "type": lambda record: (record.suffix.lower(), record.path),
+        "date": lambda record: (record.mtime, record.path),
+    }
+
+    def __init__(self, directory, recursive=False, use_inotify=True, max_searches=64):
+        """
+        :param directory: Directory to watch
+        :param recursive: Whether subdirectories are watched too
+        :param use_inotify: Use inotify when available, poll directory mtimes otherwise
+        :param max_searches: Number of search results kept up to date
+        """
+        self.directory = os.path.abspath(directory)
+        self.recursive = recursive
+        self.max_searches = max_searches
+        self.inotify = None
+        if use_inotify:
+            try:
+                self.inotify = Inotify()
+            except (OSError, AttributeError) as e:  # Not Linux, or out of inotify instances
+                logging.warning("inotify unavailable, polling %s instead: %s", self.directory, e)
+        self._reset()
+
+    def _reset(self):
+        """Drops the model and takes a new snapshot of the directory."""
+        if self.inotify is not None:
+            for wd in getattr(self, "_watches", {}):
+                self.inotify.rm_watch(wd)
+        self.files = {}  # path -> FileRecord
+        self._by_directory = defaultdict(set)  # directory -> paths of its files
+        self.directories = {}  # path -> mtime_ns when it was last listed
+        self._watches = {}  # inotify watch descriptor -> directory
+        self._unwatched = set()  # Directories inotify could not watch (e.g. out of watches), polled instead
+        self._groups = defaultdict(dict)  # extension -> {path: name}
+        self._sorted = {}  # sort_by -> sorted list of (key, path), built on first use
+        self._searches = OrderedDict()  # substring -> {path: name}
+        self._add_directory(self.directory)
+
+    def close(self):
+        if self.inotify is not None:
+            self.inotify.close()
+            self.inotify = None
+
+    def _add_directory(self, directory):
+        """Lists a new directory (and its subdirectories when recursive) into the model."""
+        pending = [directory]
+        while pending:
+            directory = pending.pop()
+            if self.inotify is not None:
+                try:  # Watched before listing, so no file created in between is missed
+                    self._watches[self.inotify.add_watch(directory)] = directory
+                except OSError as e:
+                    if os.path.isdir(directory):
+                        logging.warning("Can not watch %s, polling it instead: %s", directory, e)
+                        self._unwatched.add(directory)
+            try:
+                mtime_ns = os.stat(directory).st_mtime_ns
+                records, subdirectories = DirectoryScanner.scan_directory(directory)
+            except OSError:
+                continue
+            self.directories[directory] = mtime_ns
+            for record in records:
+                self._put(record)
+            if self.recursive:
+                pending.extend(subdirectories)
+
+    def _remove_directory(self, directory):
+        """Removes a deleted or moved directory and everything under it from the model."""
+        prefix = directory.rstrip(os.sep) + os.sep
+        for path in [path for path in self.directories if path == directory or path.startswith(prefix)]:
+            del self.directories[path]
+            self._unwatched.discard(path)
+        for wd in [wd for wd, path in self._watches.items() if path == directory or path.startswith(prefix)]:
+            del self._watches[wd]
+            self.inotify.rm_watch(wd)
+        for path in [path for path in self._by_directory if path == directory or path.startswith(prefix)]:
+            for file_path in list(self._by_directory[path]):
+                self._remove(file_path)
+
+    def _put(self, record):
+        """Adds or updates the record of a file in the model and its derived indexes."""
+        old = self.files.get(record.path)
+        if old == record:
+            return
+        if old is not None:
+            self._remove(record.path)
+        self.files[record.path] = record
+        self._by_directory[os.path.dirname(record.path)].add(record.path)
+        self._groups[record.suffix.lstrip('.')][record.path] = record.name
+        for sort_by, entries in self._sorted.items():
+            insort(entries, (self.SORT_KEYS[sort_by](record), record.path))
+        for substring, matches in self._searches.items():
+            if substring in record.name:
+                matches[record.path] = record.name
+
+    def _remove(self, path):
+        """Removes the record of a file from the model and its derived indexes."""
+        record = self.files.pop(path, None)
+        if record is None:
+            return
+        directory = os.path.dirname(path)
+        self._by_directory[directory].discard(path)
+        if not self._by_directory[directory]:
+            del self._by_directory[directory]
+        extension = record.suffix.lstrip('.')
+        self._groups[extension].pop(path, None)
+        if not self._groups[extension]:
+            del self._groups[extension]
+        for sort_by, entries in self._sorted.items():
+            entry = (self.SORT_KEYS[sort_by](record), path)
+            position = bisect_left(entries, entry)
+            if position < len(entries) and entries[position] == entry:
+                del entries[position]
+        for matches in self._searches.values():
+            matches.pop(path, None)
+
+    def _refresh_file(self, path):
+        """Stats a file again, removing it from the model if it is gone."""
+        try:
+            if os.path.isfile(path):
+                stat = os.stat(path)
+                name = os.path.basename(path)
+                self._put(DirectoryScanner.record(name, path, stat))
+                return
+        except OSError:
+            pass
+        self._remove(path)
+
+    def sync(self):
+        """Applies the changes since the last sync to the model, returns the number of changes seen."""
+        if self.inotify is not None:
+            changes = self._apply_events(self.inotify.read_events())
+            return changes + self._poll(self._unwatched) if self._unwatched else changes
+        return self._poll(self.directories)
+
+    def _apply_events(self, events):
+        changed_files, changes = set(), 0
+        for wd, mask, name in events:
+            if mask & IN_Q_OVERFLOW:  # Events were lost, start over
+                logging.warning("inotify queue overflowed, rescanning %s", self.directory)
+                self._reset()
+                return len(events)
+            directory = self._watches.get(wd)
+            if directory is None or mask & IN_IGNORED:
+                continue
+            changes += 1
+            if mask & (IN_DELETE_SELF | IN_MOVE_SELF):
+                self._remove_directory(directory)
+                if directory == self.directory:
+                    self._reset()
+                continue
+
+            path = os.path.join(directory, name)
+            if mask & IN_ISDIR:
+                if not self.recursive:
+                    continue
+                if mask & (IN_DELETE | IN_MOVED_FROM):
+                    self._remove_directory(path)
+                elif mask & (IN_CREATE | IN_MOVED_TO):
+                    self._add_directory(path)
+            else:
+                changed_files.add(path)  # Several events of one file are applied once
+
+        for path in changed_files:
+            self._refresh_file(path)
+        return changes
+
+    def _poll(self, directories):
+        """Lists again the given directories whose mtime changed since they were last listed."""
+        changes = 0
+        for directory in list(directories):
+            if directory not in self.directories:  # Removed with its parent in this sync
+                continue
+            try:
+                current = os.stat(directory).st_mtime_ns
+                if current == self.directories[directory]:
+                    continue
+                records, subdirectories = DirectoryScanner.scan_directory(directory)
+            except OSError:
+                self._remove_directory(directory)
+                changes += 1
+                continue
+
+            self.directories[directory] = current
+            listed = {record.path for record in records}
+            for path in self._by_directory.get(directory, set()) - listed:
+                self._remove(path)
+                changes += 1
+            for record in records:
+                if self.files.get(record.path) != record:
+                    self._put(record)
+                    changes += 1
+            if self.recursive:
+                for path in subdirectories:
+                    if path not in self.directories:
+                        self._add_directory(path)
+                        changes += 1
+        return changes
+
+    def records(self, sort_by=None, reverse=False):
+        """
+        Returns the FileRecords of the model.
+
+        :param sort_by: (Optional) "name", "type" or "date"
+        """
+        if sort_by is None:
+            return list(self.files.values())
+        if sort_by not in self._sorted:
+            key = self.SORT_KEYS[sort_by]
+            self._sorted[sort_by] = sorted((key(record), record.path) for record in self.files.values())
+        entries = reversed(self._sorted[sort_by]) if reverse else self._sorted[sort_by]
+        return [self.files[path] for _, path in entries]
+
+    def categories(self):
+        """Returns {extension without the dot: file names}, files without an extension are grouped under ''."""
+        groups = defaultdict(list)
+        for extension, names in self._groups.items():
+            groups[extension] = list(names.values())
+        return groups
+
+    def search(self, substring):
+        """Returns the names of the files containing the substring, recent searches are kept up to date."""
+        if substring in self._searches:
+            self._searches.move_to_end(substring)
+        else:
+            self._searches[substring] = {path: record.name for path, record in self.files.items()
+                                         if substring in record.name}
+            if len(self._searches) > self.max_searches:
+                self._searches.popitem(last=False)
+        return list(self._searches[substring].values())
@@ -0,0 +1,115 @@
+import os
+import time
+import queue
+import atexit
+import logging
+import threading
+from logging.handlers import QueueHandler, QueueListener, MemoryHandler
+
+
+LOG_FORMAT = "%(asctime)s - %(levelname)s - %(message)s"
+
+
+class DeferredQueueHandler(QueueHandler):
+    """QueueHandler that leaves formatting of the records to the listener thread."""
+    def prepare(self, record):
+        return record
+
+
+class BatchingHandler(MemoryHandler):
+    """MemoryHandler that also flushes once its oldest buffered record is older than flush_interval."""
+    def __init__(self, capacity, target, flush_interval=2.0):
+        super().__init__(capacity, flushLevel=logging.ERROR, target=target)
+        self.flush_interval = flush_interval
+        self._first_buffered = None
+
+    def shouldFlush(self, record):
+        if self._first_buffered is None:
+            self._first_buffered = time.monotonic()
+        return super().shouldFlush(record) or self.is_due()
+
+    def is_due(self):
+        """Whether the oldest buffered record has waited flush_interval seconds."""
+        first_buffered = self._first_buffered
+        return first_buffered is not None and time.monotonic() - first_buffered >= self.flush_interval
+
+    def flush(self):
+        super().flush()
+        self._first_buffered = None
+
+    def close(self):
+        target = self.target
+        super().close()  # Flushes the remaining batch
+        if target is not None:
+            target.close()
+
+
+class BatchingQueueListener(QueueListener):
+    """QueueListener that wakes up while the queue is idle, so buffered records are written within flush_interval."""
+    def __init__(self, log_queue, *handlers, flush_interval=2.0):
+        super().__init__(log_queue, *handlers)
+        self.flush_interval = flush_interval
+
+    def dequeue(self, block):
+        if not block:
+            return self.queue.get(False)
+        while True:
+            try:
+                return self.queue.get(timeout=self.flush_interval / 2)
+            except queue.Empty:
+                for handler in self.handlers:
+                    if handler.is_due():
+                        handler.flush()
+
+    def add_handler(self, handler):
+        self.handlers = self.handlers + (handler,)  # Swapped at once, the listener thread never sees a partial tuple
+
+
+_listener = None
+_log_files = set()
+_lock = threading.Lock()
+
+
+def _file_handler(log_file, fmt, capacity, flush_interval):
+    if os.path.dirname(log_file):
+        os.makedirs(os.path.dirname(log_file), exist_ok=True)
+    file_handler = logging.FileHandler(log_file, encoding="utf-8")
+    file_handler.setFormatter(logging.Formatter(fmt))
+    return BatchingHandler(capacity, file_handler, flush_interval)
+
+
+def setup_logging(log_file="logs/file_operations.log", level=logging.INFO, fmt=LOG_FORMAT, capacity=200,
+                  flush_interval=2.0):
+    """
+    Logs to a file from a background thread.
+
+    Log calls only put the record on a queue; a QueueListener formats the records and writes them in
+    batches of `capacity` records, at most `flush_interval` seconds after a record was buffered and at
+    once for errors. The process has a single queue and listener: later calls only add the handler of a
+    new log file, so no record is queued twice. The remaining records are written when the interpreter exits.
+    """
+    global _listener
+    with _lock:
+        if log_file in _log_files:
+            return _listener
+        handler = _file_handler(log_file, fmt, capacity, flush_interval)
+        _log_files.add(log_file)
+        if _listener is not None:
+            _listener.add_handler(handler)
+            return _listener
+
+        log_queue = queue.SimpleQueue()
+        root = logging.getLogger()
+        root.addHandler(DeferredQueueHandler(log_queue))
+        root.setLevel(level)
+
+        _listener = BatchingQueueListener(log_queue, handler, flush_interval=flush_interval)
+        _listener.start()
+        atexit.register(_stop, _listener)
+        return _listener
+
+
+def _stop(listener):
+    listener.stop()
+    for handler in listener.handlers:
+        handler.close()
@@ -0,0 +1,89 @@
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+
+
+class RecordCache:
+    """
+    Keeps the parsed records of files in memory until the file changes.
+
+    A file is identified by its path and its version by (mtime, size, inode), so an edited or replaced
+    file is parsed again. Entries are evicted in least recently used order once the estimated memory
+    of the cached records exceeds max_bytes. Besides the records themselves, data derived from them
+    (e.g. indexes) can be cached under another `kind` and is invalidated together with them.
+    """
+    def __init__(self, max_bytes=256 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # (path, kind) -> (signature, value, size)
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def signature(path):
+        """Returns the (mtime, size, inode) version of a file."""
+        stat = os.stat(path)
+        return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+    @staticmethod
+    def estimate_size(records):
+        """Roughly estimates the memory used by a list of records."""
+        size = sys.getsizeof(records)
+        for record in records:
+            size += sys.getsizeof(record)
+            if isinstance(record, dict):
+                size += sum(sys.getsizeof(value) for value in record.values())
+        return size
+
+    def fits(self, path):
+        """Checks whether a file is small enough to be cached at all, parsed data is larger than the file."""
+        return os.path.getsize(path) <= self.max_bytes
+
+    def get(self, path, signature, kind="records"):
+        """Returns the cached records (or other kind of value) of the file version, or None."""
+        key = (os.path.abspath(path), kind)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != signature:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, path, signature, value, kind="records", size=None):
+        """
+        Caches the records (or other kind of value) of a file version, replacing older versions of the file.
+
+        :param size: (Optional) Estimated memory of the value, estimated as a list of records otherwise
+        """
+        key = (os.path.abspath(path), kind)
+        size = self.estimate_size(value) if size is None else size
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            if key in self._entries and self._entries[key][0] != signature:
+                self._remove_path(key[0])  # Everything derived from the old version is stale
+            self._remove(key)
+            self._entries[key] = (signature, value, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate(self, path):
+        """Drops everything cached for a file."""
+        with self._lock:
+            self._remove_path(os.path.abspath(path))
+
+    def _remove_path(self, path):
+        for key in [key for key in self._entries if key[0] == path]:
+            self._remove(key)
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[2]
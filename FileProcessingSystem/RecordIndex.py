@@ -0,0 +1,112 @@
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+
+
+
+class RecordIndex:
+    """
+    Indexes the records of one file version for fast lookups.
+
+    Indexes are built lazily, the first time a field is queried, and then reused:
+    - equality uses a hash index {value: positions}
+    - numeric ranges use a sorted index searched with bisect
+    - case-insensitive substring search uses a trigram index, whose candidates are then verified
+    Query results are returned in the order of the records in the file.
+    """
+    def __init__(self, records):
+        self.records = records
+        self._hash_indexes = {}
+        self._sorted_indexes = {}
+        self._trigram_indexes = {}
+
+    def _hash_index(self, field):
+        """Returns ({value: positions}, positions of unhashable values) for the field."""
+        if field not in self._hash_indexes:
+            positions, unhashable = defaultdict(list), []
+            for position, record in enumerate(self.records):
+                value = record.get(field)
+                try:
+                    positions[value].append(position)
+                except TypeError:
+                    unhashable.append(position)
+            self._hash_indexes[field] = (dict(positions), unhashable)
+        return self._hash_indexes[field]
+
+    def _sorted_index(self, field):
+        """Returns (sorted numeric values, their positions) for the field."""
+        if field not in self._sorted_indexes:
+            pairs = sorted((record[field], position) for position, record in enumerate(self.records)
+                           if field in record and isinstance(record[field], (int, float)))
+            self._sorted_indexes[field] = ([value for value, _ in pairs], [position for _, position in pairs])
+        return self._sorted_indexes[field]
+
+    def _trigram_index(self, field):
+        """Returns ({trigram: positions}, {position: lowercase value}) for the string values of the field."""
+        if field not in self._trigram_indexes:
+            trigrams, values = defaultdict(set), {}
+            for position, record in enumerate(self.records):
+                value = record.get(field)
+                if isinstance(value, str):
+                    value = value.lower()
+                    values[position] = value
+                    for start in range(len(value) - 2):
+                        trigrams[value[start:start + 3]].add(position)
+            self._trigram_indexes[field] = (dict(trigrams), values)
+        return self._trigram_indexes[field]
+
+    def equals(self, field, value):
+        """Returns the positions of records whose field equals the value (missing fields equal None)."""
+        positions, unhashable = self._hash_index(field)
+        try:
+            matches = set(positions.get(value, ()))
+        except TypeError:
+            matches = set()
+        matches.update(position for position in unhashable if self.records[position].get(field) == value)
+        return matches
+
+    def in_range(self, field, min_value=None, max_value=None):
+        """Returns the positions of records whose numeric field lies within [min_value, max_value]."""
+        values, positions = self._sorted_index(field)
+        start = 0 if min_value is None else bisect_left(values, min_value)
+        end = len(values) if max_value is None else bisect_right(values, max_value)
+        return set(positions[start:end])
+
+    def contains(self, field, substring):
+        """Returns the positions of records whose string field contains the substring (case insensitive)."""
+        trigrams, values = self._trigram_index(field)
+        substring = substring.lower()
+
+        if len(substring) < 3:  # Too short for trigrams, scan the lowercase values
+            return {position for position, value in values.items() if substring in value}
+
+        candidates = None
+        for start in range(len(substring) - 2):
+            positions = trigrams.get(substring[start:start + 3])
+            if not positions:
+                return set()
+            candidates = set(positions) if candidates is None else candidates & positions
+
+        return {position for position in candidates if substring in values[position]}
+
+    def query(self, equals=None, ranges=None, contains=None):
+        """
+        Returns the records matching every predicate.
+
+        :param equals: (Optional) {field: value} exact matches
+        :param ranges: (Optional) {field: (min_value, max_value)} numeric ranges, either bound may be None
+        :param contains: (Optional) {field: substring} case-insensitive substring matches
+        """
+        matches = None
+        predicates = ([(self.equals, field, (value,)) for field, value in (equals or {}).items()] +
+                      [(self.in_range, field, bounds) for field, bounds in (ranges or {}).items()] +
+                      [(self.contains, field, (substring,)) for field, substring in (contains or {}).items()])
+
+        for lookup, field, arguments in predicates:
+            positions = lookup(field, *arguments)
+            matches = positions if matches is None else matches & positions
+            if not matches:
+                return []
+
+        if matches is None:
+            return list(self.records)
+        return [self.records[position] for position in sorted(matches)]
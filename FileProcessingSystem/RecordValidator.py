@@ -0,0 +1,115 @@
+import copy
+import itertools
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+
+
+class RecordValidator:
+    """
+    Validates records against required fields and data types in a single pass.
+
+    The rules are compiled once (required fields into a set checked with one subset test, data types
+    into a tuple of pairs), and every record is checked against all of them. Instead of stopping at the
+    first failing record, validation returns a report with the number of failing rows, the count of each
+    error, the first error found and a few sample rows. first_error stops at the first failing record
+    when only that is needed.
+    """
+    def __init__(self, required_fields=None, data_types=None, sample_size=5):
+        self.required_fields = tuple(required_fields or ())
+        self.required_set = frozenset(self.required_fields)
+        self.data_types = tuple((data_types or {}).items())
+        self.sample_size = sample_size
+
+    def check(self, item):
+        """Returns the list of errors of one record, empty when it is valid."""
+        if not isinstance(item, dict):
+            return ["Each item in data should be a dictionary."]
+
+        errors = []
+        if not self.required_set.issubset(item.keys()):
+            missing_fields = [field for field in self.required_fields if field not in item]
+            errors.append(f"Missing required fields: {missing_fields}")
+
+        for field, expected_type in self.data_types:
+            if field in item and type(item[field]) is not expected_type:
+                errors.append(f"Field '{field}' should be of type {expected_type.__name__}, "
+                              f"but got {type(item[field]).__name__}")
+        return errors
+
+    def empty_report(self):
+        return {"valid": True, "rows": 0, "invalid_rows": 0, "errors": {}, "first_error": None, "samples": []}
+
+    def first_error(self, records):
+        """Returns the first error of the first failing record, None when every record is valid."""
+        for item in records:
+            item_errors = self.check(item)
+            if item_errors:
+                return item_errors[0]
+        return None
+
+    def validate(self, records, start=0):
+        """
+        Validates records and returns the report.
+
+        :param records: Iterable of records
+        :param start: Row number of the first record, used for the samples
+        """
+        report = self.empty_report()
+        errors, samples = report["errors"], report["samples"]
+        row = start - 1
+
+        for row, item in enumerate(records, start):
+            item_errors = self.check(item)
+            if item_errors:
+                report["invalid_rows"] += 1
+                if report["first_error"] is None:
+                    report["first_error"] = item_errors[0]
+                for error in item_errors:
+                    errors[error] = errors.get(error, 0) + 1
+                if len(samples) < self.sample_size:
+                    samples.append({"row": row, "errors": item_errors, "record": copy.deepcopy(item)})
+
+        report["rows"] = row + 1 - start
+        report["valid"] = report["invalid_rows"] == 0
+        return report
+
+    def merge(self, report, other):
+        """Adds the report of a later chunk of records to report."""
+        report["rows"] += other["rows"]
+        report["invalid_rows"] += other["invalid_rows"]
+        report["valid"] = report["valid"] and other["valid"]
+        if report["first_error"] is None:
+            report["first_error"] = other["first_error"]
+        for error, count in other["errors"].items():
+            report["errors"][error] = report["errors"].get(error, 0) + count
+        report["samples"].extend(other["samples"][:self.sample_size - len(report["samples"])])
+        return report
+
+    def validate_parallel(self, records, processes, chunk_size=10000):
+        """
+        Validates records in chunks on a pool of worker processes.
+
+        At most two chunks per process are in flight, so records are still streamed rather than
+        loaded up front, and chunk reports are merged in order.
+        """
+        report = self.empty_report()
+        records = iter(records)
+        pending = deque()
+        start = 0
+
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            while True:
+                chunk = list(itertools.islice(records, chunk_size))
+                if not chunk:
+                    break
+                pending.append(executor.submit(self.validate, chunk, start))
+                start += len(chunk)
+
+                if len(pending) >= processes * 2:
+                    self.merge(report, pending.popleft().result())
+
+            while pending:
+                self.merge(report, pending.popleft().result())
+
+        return report
@@ -10,16 +10,10 @@ import time, random, csv, json, logging, undetected_chromedriver as uc
 from bs4 import BeautifulSoup
 
 from ProductCatalogCrawler.src.data_cleaning_and_analysis import DataCleaningAndAnalysis
+from WebScrapingFundamentals.src.QueueLogging import setup_logging
 
-# Setup logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='[%(asctime)s] [%(levelname)s] - %(message)s',
-    handlers=[
-        logging.FileHandler("scraping.log"),
-        logging.StreamHandler()
-    ]
-)
+# Setup logging, records are written to the file and the console by a background thread
+setup_logging("scraping.log", fmt='[%(asctime)s] [%(levelname)s] - %(message)s')
 logger = logging.getLogger(__name__)
 
 # List of rotating user agents
@@ -33,7 +27,7 @@ USER_AGENTS = [
 
 def configure_driver():
     user_agent = random.choice(USER_AGENTS)
-    logger.info(f"Using User-Agent: {user_agent}")
+    logger.info("Using User-Agent: %s", user_agent)
 
     options = uc.ChromeOptions()
     options.add_argument(f"user-agent={user_agent}")
@@ -66,7 +60,7 @@ def scrape_all_pages(driver, base_url):
     page_amount_to_scrape = 6  # Change as needed
 
     while page_number < page_amount_to_scrape:
-        logger.info(f"Scraping Page {page_number}")
+        logger.info("Scraping Page %s", page_number)
         scrape_current_page(driver)
 
         try:
@@ -82,7 +76,7 @@ def scrape_all_pages(driver, base_url):
 
             for attempt in range(1, max_retries + 1):
                 try:
-                    logger.info(f"Attempt {attempt}: Trying to click 'Next'...")
+                    logger.info("Attempt %s: Trying to click 'Next'...", attempt)
 
                     next_button = WebDriverWait(driver, 10).until(
                         EC.element_to_be_clickable((By.XPATH,
@@ -96,13 +90,13 @@ def scrape_all_pages(driver, base_url):
 
                     page_number += 1
                     wait_time = random.randint(3, 5)
-                    logger.info(f"Successfully navigated to Page {page_number}. Waiting {wait_time}s.")
+                    logger.info("Successfully navigated to Page %s. Waiting %ss.", page_number, wait_time)
                     time.sleep(wait_time)
                     break
 
                 except (NoSuchElementException, ElementClickInterceptedException, TimeoutException) as e:
                     wait = 2 ** (attempt - 1)  # exponential backoff: 1, 2, 4, 8, 16
-                    logger.warning(f"Retry {attempt}: Click failed due to: {e}. Retrying in {wait}s...")
+                    logger.warning("Retry %s: Click failed due to: %s. Retrying in %ss...", attempt, e, wait)
                     time.sleep(wait)
 
         except TimeoutException:
@@ -150,7 +144,7 @@ def scrape_current_page(driver):
                 "delivery": delivery
             })
         except Exception as e:
-            logger.error(f"Error parsing product: {e}")
+            logger.error("Error parsing product: %s", e)
 
 
 def write_to_csv():
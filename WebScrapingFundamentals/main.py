@@ -35,17 +35,15 @@ def task2():
         # Extract the first quote
         print("First Quote:", parser.get_text(".quote .text"), "\n")
 
-        # Extract all author names
-        authors = [author.get_text(strip=True) for author in parser.get_elements(".quote .author")]
-        print("Authors:", authors, "\n")
-
-        # Extract all tags from quotes
-        tags = [tag.get_text(strip=True) for tag in parser.get_elements(".quote .tags .tag")]
-        print("Tags:", tags, "\n")
-
-        # Extract next page link
-        next_page = parser.get_attribute(".next a", "href")
-        print("Next Page Link:", f"{url}{next_page}" if next_page else "No next page", "\n")
+        # Extract all author names, all tags and the next page link in a single pass over the page
+        fields = parser.extract({
+            "authors": {"selector": ".quote .author", "many": True},
+            "tags": {"selector": ".quote .tags .tag", "many": True},
+            "next_page": {"selector": ".next a", "attribute": "href"},
+        })
+        print("Authors:", fields["authors"], "\n")
+        print("Tags:", fields["tags"], "\n")
+        print("Next Page Link:", f"{url}{fields['next_page']}" if fields["next_page"] else "No next page", "\n")
 
         # Extract all text content
         print("All Visible Text:\n", parser.get_all_text(), "\n")
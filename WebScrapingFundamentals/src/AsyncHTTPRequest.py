@@ -0,0 +1,139 @@
+import asyncio
+from urllib.parse import urlsplit
+
+import aiohttp
+from WebScrapingFundamentals.src.HTTPRequest import build_headers, describe_status
+
+
+class AsyncFetchEngine:
+    """
+    Owns one aiohttp session and the concurrency limits shared by AsyncHTTPRequest instances.
+
+    A global semaphore bounds the number of requests in flight, and a semaphore per host keeps
+    any single site from taking all the slots.
+    """
+    def __init__(self, max_concurrency=100, per_host_limit=8, timeout=30):
+        """
+        :param max_concurrency: Maximum number of requests in flight across all hosts
+        :param per_host_limit: Maximum number of requests in flight to a single host
+        :param timeout: Total timeout of a single request in seconds
+        """
+        self.max_concurrency = max_concurrency
+        self.per_host_limit = per_host_limit
+        self.timeout = timeout
+        self._session = None
+        self._semaphore = None
+        self._host_semaphores = {}
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    async def open(self):
+        """Creates the aiohttp session, must be called from inside the running event loop."""
+        if self._session is None:
+            connector = aiohttp.TCPConnector(limit=self.max_concurrency, limit_per_host=self.per_host_limit)
+            self._session = aiohttp.ClientSession(connector=connector,
+                                                  timeout=aiohttp.ClientTimeout(total=self.timeout))
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._host_semaphores = {}
+
+    async def close(self):
+        """Closes the session and all of its connections."""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def _host_semaphore(self, url):
+        """Returns the semaphore limiting concurrent requests to the url's host."""
+        host = urlsplit(url).netloc
+        if host not in self._host_semaphores:
+            self._host_semaphores[host] = asyncio.Semaphore(self.per_host_limit)
+        return self._host_semaphores[host]
+
+    async def request(self, method, url, data=None, headers=None):
+        """
+        Sends a request once a global and a per-host slot are free.
+
+        :return: (status code, response text)
+        """
+        await self.open()
+        headers = {key: value for key, value in (headers or {}).items() if value is not None}
+        ssl = False if method == "GET" else True  # verify is false for GET requests for testing
+        json_data = data if method != "GET" else None
+
+        # Wait for the host slot first, so requests queued for a busy host don't hold global slots
+        async with self._host_semaphore(url), self._semaphore:
+            async with self._session.request(method, url, json=json_data, headers=headers, ssl=ssl) as response:
+                return response.status, await response.text()
+
+
+class AsyncHTTPRequest:
+    def __init__(self, url, auth_token=None, user_agent=None, engine=None):
+        """
+        Asynchronous counterpart of HTTPRequest with the same status-code handling.
+
+        :param url: API endpoint
+        :param auth_token: (Optional) Bearer token for authentication
+        :param user_agent: (Optional) Custom user-agent
+        :param engine: (Optional) AsyncFetchEngine to share, a temporary one is used per request otherwise
+        """
+        self.url = url
+        self.auth_token = auth_token
+        self.user_agent = user_agent
+        self.engine = engine
+
+    def _get_headers(self, custom_headers=None):
+        """Generates default headers with authentication and User-Agent."""
+        return build_headers(self.auth_token, self.user_agent, custom_headers)
+
+    async def http_method(self, method, data=None, headers=None):
+        """
+        Sends an HTTP request using the specified method.
+
+        :param method: HTTP method (GET, POST, PUT, DELETE)
+        :param data: (Optional) Data to send in request body (for POST/PUT)
+        :param headers: (Optional) Custom headers
+        :return: Response text or error message
+        """
+        try:
+            if method not in ("GET", "POST", "PUT", "DELETE"):
+                return "Error: No response received."
+
+            headers = self._get_headers(headers)
+
+            if self.engine is not None:
+                status_code, text = await self.engine.request(method, self.url, data, headers)
+            else:
+                async with AsyncFetchEngine() as engine:
+                    status_code, text = await engine.request(method, self.url, data, headers)
+
+            return describe_status(status_code, text)
+
+        except aiohttp.ClientSSLError as e:
+            return f"SSL Error: {e}"
+        except aiohttp.ClientConnectionError:
+            return "Connection Error: Unable to connect to the server."
+        except asyncio.TimeoutError:
+            return "Timeout Error: The request took too long to complete."
+        except aiohttp.ClientError as e:
+            return f"Request Exception: {e}"
+        except Exception as e:
+            return f"An unexpected error occurred: {e}"
+
+
+async def fetch_all(urls, method="GET", auth_token=None, user_agent=None, max_concurrency=100,
+                    per_host_limit=8):
+    """
+    Fetches many urls on one event loop and returns the results in the order of the urls.
+
+    :param urls: Urls to request
+    :param method: HTTP method used for every url
+    :return: List of response texts or error messages
+    """
+    async with AsyncFetchEngine(max_concurrency, per_host_limit) as engine:
+        requests = [AsyncHTTPRequest(url, auth_token, user_agent, engine) for url in urls]
+        return await asyncio.gather(*(request.http_method(method) for request in requests))
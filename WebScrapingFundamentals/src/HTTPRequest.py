@@ -1,33 +1,124 @@
 import requests
+from WebScrapingFundamentals.src.SessionPool import SessionPool
+
+
+def describe_status(status_code, text):
+    """
+    Maps an HTTP status code to the result returned by HTTPRequest.http_method.
+
+    :param status_code: HTTP status code of the response
+    :param text: Response body
+    :return: Response text for 200, otherwise a description of the status
+    """
+    if status_code == 200:
+        return text
+    elif status_code == 201:
+        return "Success: Resource created successfully."
+    elif status_code == 204:
+        return "Success: No content (Action successful but no response body)."
+    elif status_code == 400:
+        return f"Bad Request: The server could not understand the request. {text}"
+    elif status_code == 401:
+        return "Unauthorized: Invalid or missing authentication credentials."
+    elif status_code == 403:
+        return "Forbidden: You do not have permission to access this resource."
+    elif status_code == 404:
+        return "Not Found: The requested resource could not be found."
+    elif status_code == 500:
+        return "Internal Server Error: The server encountered an unexpected condition."
+    elif status_code == 502:
+        return "Bad Gateway: The server received an invalid response from the upstream server."
+    elif status_code == 503:
+        return "Service Unavailable: The server is currently unable to handle the request."
+    elif status_code == 504:
+        return "Gateway Timeout: The server did not receive a timely response from an upstream server."
+    else:
+        return f"Unexpected Error ({status_code}): {text}"
+
+
+def build_headers(auth_token=None, user_agent=None, custom_headers=None):
+    """Generates default headers with authentication and User-Agent."""
+    headers = {
+        "User-Agent": user_agent,
+        "Accept": "application/json",
+    }
+
+    if auth_token:
+        headers["Authorization"] = f"Bearer {auth_token}"
+
+    if custom_headers:
+        headers.update(custom_headers)  # Merge custom headers
+
+    return headers
 
 
 class HTTPRequest:
-    def __init__(self, url, auth_token=None, user_agent=None):
+    def __init__(self, url, auth_token=None, user_agent=None, session_pool=None, cache=None):
         """
         Initializes the HTTPRequest class with a URL, authentication token, and user-agent.
 
         :param url: API endpoint
         :param auth_token: (Optional) Bearer token for authentication
         :param user_agent: (Optional) Custom user-agent
+        :param session_pool: (Optional) SessionPool to send requests through, defaults to the shared pool
+        :param cache: (Optional) ResponseCache used for GET requests
         """
         self.url = url
         self.auth_token = auth_token
         self.user_agent = user_agent
+        self.session_pool = session_pool or SessionPool.default()
+        self.cache = cache
+        self.not_modified = False  # True when the last GET was answered by an unchanged cache entry
 
     def _get_headers(self, custom_headers=None):
         """Generates default headers with authentication and User-Agent."""
-        headers = {
-            "User-Agent": self.user_agent,
-            "Accept": "application/json",
-        }
+        return build_headers(self.auth_token, self.user_agent, custom_headers)
 
-        if self.auth_token:
-            headers["Authorization"] = f"Bearer {self.auth_token}"
+    def send(self, method, data=None, headers=None, **kwargs):
+        """
+        Sends the request through the pooled session and returns the raw requests.Response.
 
-        if custom_headers:
-            headers.update(custom_headers)  # Merge custom headers
+        Unlike http_method, exceptions from requests are not caught here.
+        """
+        if method not in ("GET", "POST", "PUT", "DELETE"):
+            return None
 
-        return headers
+        headers = self._get_headers(headers)
+        verify = method != "GET"  # verify is false for GET requests for testing
+        json_data = data if method != "GET" else None
+
+        return self.session_pool.request(method, self.url, json=json_data, headers=headers, verify=verify,
+                                         **kwargs)
+
+    def _cached_get(self, headers=None):
+        """Answers a GET from the cache when fresh, otherwise revalidates or refreshes the entry."""
+        entry = self.cache.get("GET", self.url)
+
+        if entry is not None and self.cache.is_fresh(entry):
+            text = self.cache.read_text("GET", self.url)
+            if text is not None:
+                self.not_modified = True
+                return text
+            entry = None  # Evicted meanwhile, a cache miss
+
+        request_headers = headers
+        if entry is not None:
+            request_headers = {**self.cache.conditional_headers(entry), **(headers or {})}
+
+        response = self.send("GET", headers=request_headers)
+
+        if response.status_code == 304 and entry is not None:
+            self.cache.revalidated("GET", self.url, response)
+            text = self.cache.read_text("GET", self.url)
+            if text is not None:
+                self.not_modified = True
+                return text
+            response = self.send("GET", headers=headers)  # Evicted meanwhile, downloaded again
+
+        if response.status_code == 200:
+            self.cache.store("GET", self.url, response)
+
+        return describe_status(response.status_code, response.text)
 
     def http_method(self, method, data=None, headers=None):
         """
@@ -39,48 +130,17 @@ class HTTPRequest:
         :return: Response text or error message
         """
         try:
-            response = None
-            headers = self._get_headers(headers)
-
-            if method == "GET":
-                response = requests.get(self.url, headers=headers, verify=False)  # verify is false for testing
-            elif method == "POST":
-                response = requests.post(self.url, json=data, headers=headers, verify=True)
-            elif method == "PUT":
-                response = requests.put(self.url, json=data, headers=headers, verify=True)
-            elif method == "DELETE":
-                response = requests.delete(self.url, json=data, headers=headers, verify=True)
+            self.not_modified = False
+            if self.cache is not None and method == "GET":
+                return self._cached_get(headers)
+
+            response = self.send(method, data, headers)
 
             # Handle response status codes
             if response is None:
                 return "Error: No response received."
 
-            status_code = response.status_code
-
-            if status_code == 200:
-                return response.text
-            elif status_code == 201:
-                return "Success: Resource created successfully."
-            elif status_code == 204:
-                return "Success: No content (Action successful but no response body)."
-            elif status_code == 400:
-                return f"Bad Request: The server could not understand the request. {response.text}"
-            elif status_code == 401:
-                return "Unauthorized: Invalid or missing authentication credentials."
-            elif status_code == 403:
-                return "Forbidden: You do not have permission to access this resource."
-            elif status_code == 404:
-                return "Not Found: The requested resource could not be found."
-            elif status_code == 500:
-                return "Internal Server Error: The server encountered an unexpected condition."
-            elif status_code == 502:
-                return "Bad Gateway: The server received an invalid response from the upstream server."
-            elif status_code == 503:
-                return "Service Unavailable: The server is currently unable to handle the request."
-            elif status_code == 504:
-                return "Gateway Timeout: The server did not receive a timely response from an upstream server."
-            else:
-                return f"Unexpected Error ({status_code}): {response.text}"
+            return describe_status(response.status_code, response.text)
 
         except requests.exceptions.SSLError as e:
             return f"SSL Error: {e}"
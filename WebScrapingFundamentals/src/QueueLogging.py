@@ -0,0 +1,172 @@
+import os
+import time
+import queue
+import atexit
+import logging
+import threading
+from logging.handlers import QueueHandler, QueueListener, MemoryHandler
+
+
+# Level of per-product lines ("Scraped: <name>"), below INFO so it can be switched off or sampled on its own
+PRODUCT = 15
+logging.addLevelName(PRODUCT, "PRODUCT")
+
+LOG_FORMAT = "%(asctime)s - %(levelname)s - %(message)s"
+
+
+class DeferredQueueHandler(QueueHandler):
+    """
+    QueueHandler that puts records on the queue as they are.
+
+    The standard QueueHandler formats every record before queueing it; here the message is only built
+    by the listener thread, so a log call on the hot path costs a record and a queue put. Arguments of
+    a log call must therefore not be mutated after the call.
+    """
+    def prepare(self, record):
+        return record
+
+
+class ProductSampler(logging.Filter):
+    """
+    Lets records of at least `level` through, and PRODUCT records independently of `level`: none when
+    products are not logged, otherwise one in `every`.
+    """
+    def __init__(self, level=logging.INFO, log_products=True, every=1):
+        super().__init__()
+        self.level = level
+        self.log_products = log_products
+        self.every = max(1, every)
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if record.levelno != PRODUCT:
+            return record.levelno >= self.level
+        if not self.log_products or self.every == 1:
+            return self.log_products
+        with self._lock:
+            self._count += 1
+            return self._count % self.every == 1
+
+
+class BatchingHandler(MemoryHandler):
+    """MemoryHandler that also flushes once its oldest buffered record is older than flush_interval."""
+    def __init__(self, capacity, target, flush_interval=2.0, flush_level=logging.ERROR):
+        super().__init__(capacity, flushLevel=flush_level, target=target)
+        self.flush_interval = flush_interval
+        self._first_buffered = None
+
+    def shouldFlush(self, record):
+        if self._first_buffered is None:
+            self._first_buffered = time.monotonic()
+        return super().shouldFlush(record) or self.is_due()
+
+    def is_due(self):
+        """Whether the oldest buffered record has waited flush_interval seconds."""
+        first_buffered = self._first_buffered
+        return first_buffered is not None and time.monotonic() - first_buffered >= self.flush_interval
+
+    def flush(self):
+        super().flush()
+        self._first_buffered = None
+
+    def close(self):
+        target = self.target
+        super().close()  # Flushes the remaining batch
+        if target is not None:
+            target.close()
+
+
+class BatchingQueueListener(QueueListener):
+    """
+    QueueListener that wakes up while the queue is idle, so buffered records are written within
+    flush_interval even when no further record arrives.
+    """
+    def __init__(self, log_queue, *handlers, flush_interval=2.0, respect_handler_level=True):
+        super().__init__(log_queue, *handlers, respect_handler_level=respect_handler_level)
+        self.flush_interval = flush_interval
+
+    def dequeue(self, block):
+        if not block:
+            return self.queue.get(False)
+        while True:
+            try:
+                return self.queue.get(timeout=self.flush_interval / 2)
+            except queue.Empty:
+                for handler in self.handlers:
+                    if isinstance(handler, BatchingHandler) and handler.is_due():
+                        handler.flush()
+
+    def add_handler(self, handler):
+        self.handlers = self.handlers + (handler,)  # Swapped at once, the listener thread never sees a partial tuple
+
+
+_listener = None
+_log_files = {}  # log file -> its BatchingHandler
+_listener_lock = threading.Lock()
+
+
+def _file_handler(log_file, formatter, capacity, flush_interval):
+    if os.path.dirname(log_file):
+        os.makedirs(os.path.dirname(log_file), exist_ok=True)
+    file_handler = logging.FileHandler(log_file, encoding="utf-8")
+    file_handler.setFormatter(formatter)
+    return BatchingHandler(capacity, file_handler, flush_interval)
+
+
+def setup_logging(log_file=None, level=logging.INFO, fmt=LOG_FORMAT, console=True, capacity=200,
+                  flush_interval=2.0, log_products=True, product_sample_every=1):
+    """
+    Routes the root logger through a queue, so log I/O happens on a background thread.
+
+    Log calls only enqueue the record. A QueueListener thread formats the records and writes them to
+    the log file in batches (flushed every `capacity` records, at most `flush_interval` seconds after a
+    record was buffered and at once for errors) and to the console. The process has a single queue and
+    listener: the first call configures them, later calls only add the file handler of a new log file,
+    so no record is ever queued twice. The listener is stopped (flushing what is left) at exit.
+
+    :param log_file: (Optional) Path of the log file
+    :param level: Level of the root logger
+    :param console: Whether records are also written to the console
+    :param capacity: Number of records buffered before they are written to the file
+    :param flush_interval: Maximum number of seconds a record stays buffered
+    :param log_products: Whether per-product PRODUCT records are logged at all
+    :param product_sample_every: Keep one PRODUCT record in every `product_sample_every`
+    :return: The QueueListener
+    """
+    global _listener
+    with _listener_lock:
+        formatter = logging.Formatter(fmt)
+        if _listener is not None:
+            if log_file is not None and log_file not in _log_files:
+                _log_files[log_file] = _file_handler(log_file, formatter, capacity, flush_interval)
+                _listener.add_handler(_log_files[log_file])
+            return _listener
+
+        handlers = []
+        if log_file is not None:
+            _log_files[log_file] = _file_handler(log_file, formatter, capacity, flush_interval)
+            handlers.append(_log_files[log_file])
+        if console:
+            console_handler = logging.StreamHandler()
+            console_handler.setFormatter(formatter)
+            handlers.append(console_handler)
+
+        log_queue = queue.SimpleQueue()
+        queue_handler = DeferredQueueHandler(log_queue)
+        queue_handler.addFilter(ProductSampler(level, log_products, product_sample_every))
+
+        root = logging.getLogger()
+        root.addHandler(queue_handler)
+        root.setLevel(min(level, PRODUCT) if log_products else level)
+
+        _listener = BatchingQueueListener(log_queue, *handlers, flush_interval=flush_interval)
+        _listener.start()
+        atexit.register(_stop, _listener)
+        return _listener
+
+
+def _stop(listener):
+    listener.stop()
+    for handler in listener.handlers:
+        handler.close()
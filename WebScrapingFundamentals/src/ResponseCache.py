@@ -0,0 +1,194 @@
+import os
+import json
+import time
+import hashlib
+import threading
+
+
+class ResponseCache:
+    """
+    On-disk cache of successful responses, keyed on method and URL.
+
+    Entries remember the ETag and Last-Modified headers of the response, so once the TTL has passed
+    they are revalidated with If-None-Match / If-Modified-Since instead of downloaded again. When the
+    cache grows past max_bytes, the least recently used entries are evicted.
+
+    Every entry is stored as two files: <key>.body with the response text and <key>.json with its
+    metadata. Callers can attach derived data (e.g. parsed products) to an entry with annotate(); it is
+    dropped as soon as the response body changes.
+    """
+    def __init__(self, cache_dir=".http_cache", ttl=3600, max_bytes=256 * 1024 * 1024):
+        """
+        :param cache_dir: Directory holding the cached responses
+        :param ttl: Seconds an entry is used without asking the server, 0 always revalidates
+        :param max_bytes: Maximum total size of cached bodies before LRU eviction
+        """
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._total_bytes = 0
+
+        os.makedirs(cache_dir, exist_ok=True)
+        self._load_entries()
+        self._evict()
+
+    def _load_entries(self):
+        """Indexes the entries already on disk, using the body's mtime as last access time."""
+        for file_name in os.listdir(self.cache_dir):
+            if not file_name.endswith(".json"):
+                continue
+
+            key = file_name[:-len(".json")]
+            try:
+                with open(self._meta_path(key), mode="r", encoding="utf-8") as meta_file:
+                    meta = json.load(meta_file)
+                meta["accessed_at"] = os.path.getmtime(self._body_path(key))
+            except (OSError, ValueError):
+                self._remove_files(key)
+                continue
+
+            self._entries[key] = meta
+            self._total_bytes += meta["size"]
+
+    @staticmethod
+    def _key(method, url):
+        return hashlib.sha256(f"{method} {url}".encode("utf-8")).hexdigest()
+
+    def _body_path(self, key):
+        return os.path.join(self.cache_dir, key + ".body")
+
+    def _meta_path(self, key):
+        return os.path.join(self.cache_dir, key + ".json")
+
+    def _write_meta(self, key, meta):
+        stored_meta = {name: value for name, value in meta.items() if name != "accessed_at"}
+        temp_path = self._meta_path(key) + ".tmp"
+        with open(temp_path, mode="w", encoding="utf-8") as meta_file:
+            json.dump(stored_meta, meta_file, ensure_ascii=False)
+        os.replace(temp_path, self._meta_path(key))
+
+    def _remove_files(self, key):
+        for path in (self._body_path(key), self._meta_path(key)):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def get(self, method, url):
+        """Returns the metadata of the cached entry or None, marking it as recently used."""
+        key = self._key(method, url)
+        with self._lock:
+            meta = self._entries.get(key)
+            if meta is None:
+                return None
+            meta["accessed_at"] = time.time()
+
+        try:
+            os.utime(self._body_path(key))  # Persists the access time for LRU order across runs
+        except FileNotFoundError:
+            self.remove(method, url)
+            return None
+        return meta
+
+    def read_text(self, method, url):
+        """Returns the cached response text, or None when the entry was evicted since get()."""
+        try:
+            with open(self._body_path(self._key(method, url)), mode="r", encoding="utf-8") as body_file:
+                return body_file.read()
+        except FileNotFoundError:
+            self.remove(method, url)
+            return None
+
+    def is_fresh(self, meta):
+        """Checks whether the entry can be used without revalidating it."""
+        return time.time() - meta["stored_at"] < self.ttl
+
+    @staticmethod
+    def conditional_headers(meta):
+        """Returns the If-None-Match / If-Modified-Since headers revalidating the entry."""
+        headers = {}
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+        return headers
+
+    def store(self, method, url, response):
+        """Caches the text and validators of a successful response."""
+        key = self._key(method, url)
+        body = response.text.encode("utf-8")
+        meta = {
+            "method": method,
+            "url": url,
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "stored_at": time.time(),
+            "size": len(body),
+            "annotations": {},
+        }
+
+        with open(self._body_path(key), mode="wb") as body_file:
+            body_file.write(body)
+        self._write_meta(key, meta)
+
+        with self._lock:
+            previous = self._entries.get(key)
+            self._total_bytes += meta["size"] - (previous["size"] if previous else 0)
+            meta["accessed_at"] = time.time()
+            self._entries[key] = meta
+        self._evict()
+
+    def revalidated(self, method, url, response):
+        """Marks the entry as fresh again after a 304 Not Modified response."""
+        key = self._key(method, url)
+        with self._lock:
+            meta = self._entries.get(key)
+            if meta is None:
+                return
+            meta["stored_at"] = time.time()
+            meta["etag"] = response.headers.get("ETag", meta["etag"])
+            meta["last_modified"] = response.headers.get("Last-Modified", meta["last_modified"])
+        self._write_meta(key, meta)
+
+    def annotate(self, method, url, name, value):
+        """Attaches JSON-serializable derived data to the cached entry."""
+        key = self._key(method, url)
+        with self._lock:
+            meta = self._entries.get(key)
+            if meta is None:
+                return
+            meta["annotations"][name] = value
+        self._write_meta(key, meta)
+
+    def annotation(self, method, url, name):
+        """Returns derived data attached to the cached entry, or None."""
+        meta = self._entries.get(self._key(method, url))
+        return meta["annotations"].get(name) if meta else None
+
+    def remove(self, method, url):
+        """Removes an entry from the cache."""
+        key = self._key(method, url)
+        with self._lock:
+            meta = self._entries.pop(key, None)
+            if meta:
+                self._total_bytes -= meta["size"]
+        self._remove_files(key)
+
+    def _evict(self):
+        """Removes least recently used entries until the cache fits into max_bytes."""
+        with self._lock:
+            if self._total_bytes <= self.max_bytes:
+                return
+            evicted = []
+            for key, meta in sorted(self._entries.items(), key=lambda item: item[1]["accessed_at"]):
+                if self._total_bytes <= self.max_bytes:
+                    break
+                self._total_bytes -= meta["size"]
+                evicted.append(key)
+            for key in evicted:
+                del self._entries[key]
+
+        for key in evicted:
+            self._remove_files(key)
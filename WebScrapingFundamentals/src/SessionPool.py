@@ -0,0 +1,74 @@
+import threading
+from http.cookiejar import DefaultCookiePolicy
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class SessionPool:
+    """
+    Shares keep-alive connections between HTTPRequest instances.
+
+    Every thread gets its own requests.Session (sessions are not safe to share), but all of them are
+    mounted on the same HTTPAdapters, whose urllib3 connection pools are thread-safe. A TCP/TLS
+    connection opened by one request is therefore reused by the next request to the same host, no
+    matter which HTTPRequest object or thread sends it. Sessions only pool connections: their cookie
+    jars accept no cookies, so requests stay as stateless as with requests.get and a Set-Cookie
+    received by one HTTPRequest is never sent by another.
+    """
+    _default = None
+    _default_lock = threading.Lock()
+
+    def __init__(self, pool_connections=10, pool_maxsize=10, pool_block=False, max_retries=0,
+                 host_pool_sizes=None):
+        """
+        :param pool_connections: Number of per-host connection pools kept alive at once
+        :param pool_maxsize: Maximum number of idle connections kept in each host pool
+        :param pool_block: If True, wait for a free connection instead of opening extra ones
+        :param max_retries: Retries for failed connections (passed to HTTPAdapter)
+        :param host_pool_sizes: (Optional) {"https://host": pool_maxsize} overrides for busy hosts
+        """
+        self._local = threading.local()
+        self._adapters = {
+            "https://": HTTPAdapter(pool_connections, pool_maxsize, max_retries, pool_block),
+            "http://": HTTPAdapter(pool_connections, pool_maxsize, max_retries, pool_block),
+        }
+
+        for host, size in (host_pool_sizes or {}).items():
+            self._adapters[self._host_prefix(host)] = HTTPAdapter(1, size, max_retries, pool_block)
+
+    @classmethod
+    def default(cls):
+        """Returns the process-wide pool used by HTTPRequest when none is given."""
+        if cls._default is None:
+            with cls._default_lock:
+                if cls._default is None:
+                    cls._default = cls()
+        return cls._default
+
+    @staticmethod
+    def _host_prefix(url):
+        """Normalizes 'https://host/path' to the 'https://host/' prefix used for mounting."""
+        parts = urlsplit(url)
+        return f"{parts.scheme}://{parts.netloc}/"
+
+    def session(self):
+        """Returns the calling thread's session, creating it on first use."""
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = requests.Session()
+            session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))  # Stateless, like requests.get
+            for prefix, adapter in self._adapters.items():
+                session.mount(prefix, adapter)
+            self._local.session = session
+        return session
+
+    def request(self, method, url, **kwargs):
+        """Sends a request through the calling thread's pooled session."""
+        return self.session().request(method, url, **kwargs)
+
+    def close(self):
+        """Closes every pooled connection."""
+        for adapter in self._adapters.values():
+            adapter.close()
@@ -1,5 +1,6 @@
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, Tag
 from WebScrapingFundamentals.src.HTTPRequest import HTTPRequest
+from WebScrapingFundamentals.src.html_parsing.SelectorRegistry import SelectorRegistry
 
 
 class HTMLContentParser:
@@ -10,18 +11,19 @@ class HTMLContentParser:
         response = self.http_request.http_method("GET")
 
         self.soup = BeautifulSoup(response, "lxml") if response else None
+        self.selectors = SelectorRegistry.default()
 
     def get_element(self, selector):
         """Extracts the first matching element using a CSS selector."""
         if not self.soup:
             return None
-        return self.soup.select_one(selector)
+        return self.selectors.css(selector).select_one(self.soup)
 
     def get_elements(self, selector):
         """Extracts all matching elements using a CSS selector."""
         if not self.soup:
             return []
-        return self.soup.select(selector)
+        return self.selectors.css(selector).select(self.soup)
 
     def get_text(self, selector):
         """Extracts the text content of an element using a CSS selector."""
@@ -38,6 +40,48 @@ class HTMLContentParser:
         elements = self.get_elements(selector)
         return [elem.get("href") for elem in elements if elem.get("href")]
 
+    def get_fields(self, fields, many=False):
+        """Extracts the text of many fields at once, given as {field name: CSS selector}, in one traversal."""
+        return self.extract({field: {"selector": selector, "many": many} for field, selector in fields.items()})
+
+    def extract(self, schema, record_type=None):
+        """
+        Extracts every field of a schema in a single traversal of the document.
+
+        :param schema: Dictionary of {field: CSS selector} or {field: {"selector": ..., "attribute": ..., "many": ...}}.
+                       "attribute" returns that attribute instead of the text, "many" returns every match as a list.
+        :param record_type: (Optional) Class built from the fields, e.g. a dataclass or namedtuple
+        :return: Dictionary of fields (None / [] when nothing matched), or an instance of record_type
+        """
+        rules = []
+        for field, rule in schema.items():
+            if isinstance(rule, str):
+                rule = {"selector": rule}
+            rules.append((field, self.selectors.css(rule["selector"]), rule.get("attribute"), rule.get("many", False)))
+
+        record = {field: [] if many else None for field, _, _, many in rules}
+        pending = list(rules)
+
+        for tag in (self.soup.descendants if self.soup else ()):
+            if not pending:
+                break  # Every single-value field is filled and there are no repeated fields
+            if not isinstance(tag, Tag):
+                continue
+
+            for rule in list(pending):
+                field, selector, attribute, many = rule
+                if not selector.match(tag):
+                    continue
+
+                value = tag.get(attribute) if attribute else tag.get_text(strip=True)
+                if many:
+                    record[field].append(value)
+                else:
+                    record[field] = value
+                    pending.remove(rule)
+
+        return record_type(**record) if record_type else record
+
     def get_all_text(self):
         """Extracts all visible text from the page, ignoring scripts and styles."""
         if not self.soup:
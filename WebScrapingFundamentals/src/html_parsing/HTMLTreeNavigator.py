@@ -1,4 +1,4 @@
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, Tag
 
 
 
@@ -13,11 +13,61 @@ class HTMLTreeNavigator:
 
     def get_children(self, element):
         """Returns a list of direct children of the given element."""
-        return list(element.children) if element else []
+        return list(self.iter_children(element))
 
     def get_descendants(self, element):
         """Returns a list of all descendant elements."""
-        return list(element.descendants) if element else []
+        return list(self.iter_descendants(element))
+
+    def iter_children(self, element, tags_only=False):
+        """Lazily yields the direct children of the given element."""
+        if not element:
+            return
+        for child in element.children:
+            if not tags_only or isinstance(child, Tag):
+                yield child
+
+    def iter_descendants(self, element, max_depth=None, predicate=None, stop=None, tags_only=False):
+        """
+        Lazily yields the descendants of the given element in document order.
+
+        :param max_depth: (Optional) Deepest level yielded, children are at depth 1
+        :param predicate: (Optional) Only nodes for which predicate(node) is true are yielded
+        :param stop: (Optional) The walk ends at the first node for which stop(node) is true
+        :param tags_only: If True, text nodes are skipped
+        """
+        for node, depth in self.walk(element, max_depth, predicate, stop, tags_only, include_root=False):
+            yield node
+
+    def walk(self, element, max_depth=None, predicate=None, stop=None, tags_only=True, include_root=True):
+        """
+        Yields (node, depth) for the element and its descendants in document order.
+
+        The walk follows the tree's parent/sibling links instead of recursing or keeping a stack,
+        so it uses constant extra memory and works on arbitrarily deep documents.
+        """
+        if not element:
+            return
+
+        node, depth = element, 0
+        while True:
+            if (include_root or node is not element) and (not tags_only or isinstance(node, Tag)):
+                if stop is not None and stop(node):
+                    return
+                if predicate is None or predicate(node):
+                    yield node, depth
+
+            # Go down to the first child, unless the depth limit is reached
+            if isinstance(node, Tag) and node.contents and (max_depth is None or depth < max_depth):
+                node, depth = node.contents[0], depth + 1
+                continue
+
+            # Otherwise go up until there is a next sibling, the walk is over when the element is reached
+            while node is not element and node.next_sibling is None:
+                node, depth = node.parent, depth - 1
+            if node is element:
+                return
+            node = node.next_sibling
 
     def get_next_sibling(self, element):
         """Returns the next sibling of the given element."""
@@ -40,8 +90,6 @@ class HTMLTreeNavigator:
         return element.get_text(strip=True) if element else ""
 
     def print_structure(self, element, level=0):
-        """Recursively prints the structure of the given element."""
-        if element:
-            print("  " * level + str(element.name))
-            for child in element.find_all(recursive=False):
-                self.print_structure(child, level + 1)
+        """Prints the structure of the given element, indenting every tag by its depth."""
+        for node, depth in self.walk(element):
+            print("  " * (level + depth) + str(node.name))
@@ -0,0 +1,73 @@
+import threading
+import soupsieve
+from lxml import etree
+
+
+class SelectorRegistry:
+    """
+    Compiles XPath expressions and CSS selectors once per process and reuses them across documents.
+
+    Compiled CSS selectors are immutable and shared by all threads. Compiled XPath objects are kept
+    per thread, since an lxml XPath evaluator should not run in two threads at once.
+    """
+    _default = None
+    _default_lock = threading.Lock()
+
+    def __init__(self):
+        self._css = {}
+        self._css_lock = threading.Lock()
+        self._local = threading.local()
+
+    @classmethod
+    def default(cls):
+        """Returns the process-wide registry used by the parsers."""
+        if cls._default is None:
+            with cls._default_lock:
+                if cls._default is None:
+                    cls._default = cls()
+        return cls._default
+
+    def xpath(self, expression):
+        """Returns the compiled etree.XPath for the expression."""
+        compiled = getattr(self._local, "xpaths", None)
+        if compiled is None:
+            compiled = self._local.xpaths = {}
+
+        if expression not in compiled:
+            compiled[expression] = etree.XPath(expression)
+        return compiled[expression]
+
+    def css(self, selector):
+        """Returns the compiled soupsieve selector for the CSS selector."""
+        if selector not in self._css:
+            with self._css_lock:
+                if selector not in self._css:
+                    self._css[selector] = soupsieve.compile(selector)
+        return self._css[selector]
+
+    @staticmethod
+    def _xpath_value(result):
+        """Converts an XPath result (element, attribute or text) to its stripped text."""
+        if isinstance(result, etree._Element):
+            return (result.text or "").strip()
+        return str(result).strip()
+
+    def extract_xpath(self, dom, fields, many=False):
+        """
+        Evaluates many XPath expressions against one document.
+
+        :param dom: lxml document or element
+        :param fields: Dictionary of {field name: XPath expression}
+        :param many: If True, returns every match of each field instead of the first one
+        :return: Dictionary of {field name: text} (or list of texts), None for fields without a match
+        """
+        record = {}
+        for field, expression in fields.items():
+            results = self.xpath(expression)(dom)
+            if not isinstance(results, list):  # count(), string() and boolean expressions
+                record[field] = results
+            elif many:
+                record[field] = [self._xpath_value(result) for result in results]
+            else:
+                record[field] = self._xpath_value(results[0]) if results else None
+        return record
@@ -0,0 +1,65 @@
+from lxml import etree
+from WebScrapingFundamentals.src.SessionPool import SessionPool
+from WebScrapingFundamentals.src.html_parsing.SelectorRegistry import SelectorRegistry
+
+
+class StreamingHTMLParser:
+    """
+    Yields records from an HTML document while its bytes are still arriving.
+
+    The document is fed to lxml's incremental HTMLPullParser chunk by chunk. As soon as a record
+    element (e.g. each <li> product or <article class="product_pod">) is closed, it is yielded and
+    then cleared together with the siblings before it, so memory stays flat on very large pages.
+    """
+    def __init__(self, tag, class_=None, fields=None, encoding=None):
+        """
+        :param tag: Tag name of the record elements
+        :param class_: (Optional) Class the record elements must have
+        :param fields: (Optional) {field: XPath relative to the record}, records are yielded as dictionaries.
+                       Without fields the element itself is yielded and is only valid until the next record.
+        :param encoding: (Optional) Encoding of the document, detected by lxml otherwise
+        """
+        self.tag = tag
+        self.class_ = class_
+        self.fields = fields
+        self.encoding = encoding
+        self.selectors = SelectorRegistry.default()
+
+    def _is_record(self, element):
+        return self.class_ is None or self.class_ in (element.get("class") or "").split()
+
+    def _inside_record(self, element):
+        return any(self._is_record(ancestor) for ancestor in element.iterancestors(self.tag))
+
+    def iter_records(self, chunks):
+        """Yields the records of a document given as an iterable of byte (or text) chunks."""
+        parser = etree.HTMLPullParser(events=("end",), tag=self.tag, encoding=self.encoding)
+
+        for chunk in chunks:
+            parser.feed(chunk)
+            yield from self._read_records(parser)
+
+        parser.close()
+        yield from self._read_records(parser)
+
+    def iter_url(self, url, chunk_size=64 * 1024):
+        """Downloads a page in chunks and yields its records while it is downloading."""
+        with SessionPool.default().request("GET", url, headers={"User-Agent": "Mozilla/5.0"}, stream=True) as response:
+            response.raise_for_status()
+            yield from self.iter_records(response.iter_content(chunk_size))
+
+    def _read_records(self, parser):
+        for _, element in parser.read_events():
+            if not self._is_record(element):
+                continue
+
+            if self.fields is None:
+                yield element
+            else:
+                yield self.selectors.extract_xpath(element, self.fields)
+
+            # A record nested in another one is cleared together with the outer record
+            if not self._inside_record(element):
+                element.clear(keep_tail=True)
+                while element.getprevious() is not None:
+                    del element.getparent()[0]
@@ -1,8 +1,17 @@
 import re
+import sys
 import html
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 from bs4 import BeautifulSoup
 
 
+WHITESPACE_PATTERN = re.compile(r'\s+')
+# Text the HTML parser changes beyond decoding entities: markup, control characters and byte order marks it
+# drops, and numeric character references it decodes differently from html.unescape (e.g. "&#8;")
+SOUP_PATTERN = re.compile(r'[<\x00-\x08\x0b\x0c\x0e-\x1f\x7f-\x9f\ufeff]|&#')
+
 
 class TextCleaner:
     @staticmethod
@@ -10,16 +19,102 @@ class TextCleaner:
         if not text:
             return ""
 
-        # 1. Remove HTML tags
-        text = BeautifulSoup(text, "lxml").text
+        # 1. Remove HTML tags (the soup would only decode the entities of other texts, so none is built for them)
+        if SOUP_PATTERN.search(text):
+            text = BeautifulSoup(text, "lxml").text
+        elif "&" in text:
+            text = html.unescape(text)  # Entities the soup would have decoded while parsing
 
         # 2. Decode HTML entities (&amp; → &)
-        text = html.unescape(text)
+        if "&" in text:
+            text = html.unescape(text)
 
         # 3. Normalize whitespace (removes multiple spaces and trims)
-        text = re.sub(r'\s+', ' ', text).strip()
+        text = WHITESPACE_PATTERN.sub(' ', text).strip()
 
         # 4. Normalize Unicode (remove special characters)
-        text = text.encode('utf-8').decode('ascii', 'ignore')
+        text = text.encode('ascii', 'ignore').decode('ascii')
 
         return text
+
+    @staticmethod
+    def clean_many(texts, processes=None, chunksize=1000, cache=None):
+        """
+        Cleans many texts at once.
+
+        :param texts: Iterable of texts
+        :param processes: (Optional) Number of worker processes for large corpora, cleans in this process otherwise
+        :param chunksize: Number of texts sent to a worker process at a time
+        :param cache: (Optional) MemoizedCleaner used instead of clean_text when cleaning in this process
+        :return: List of cleaned texts in the order of the input
+        """
+        if not processes:
+            clean = cache or TextCleaner.clean_text
+            return [clean(text) for text in texts]
+
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            return list(executor.map(TextCleaner.clean_text, texts, chunksize=chunksize))
+
+
+class MemoizedCleaner:
+    """
+    Opt-in memoization for cleaning functions, meant for low-cardinality fields (availability strings,
+    delivery blurbs, category labels) that repeat across pages.
+
+    Results are kept in LRU order and evicted once either max_entries or max_bytes is exceeded.
+    """
+    def __init__(self, clean=TextCleaner.clean_text, max_entries=10000, max_bytes=16 * 1024 * 1024):
+        """
+        :param clean: Cleaning function of one string, TextCleaner.clean_text by default
+        :param max_entries: Maximum number of cached results
+        :param max_bytes: Maximum memory of cached inputs and results, as measured by sys.getsizeof
+        """
+        self.clean = clean
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._cache = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, text):
+        """Returns the cleaned text, computing it only on a cache miss."""
+        with self._lock:
+            if text in self._cache:
+                self._cache.move_to_end(text)
+                self.hits += 1
+                return self._cache[text]
+            self.misses += 1
+
+        result = self.clean(text)
+        size = sys.getsizeof(text) + sys.getsizeof(result)
+        if size > self.max_bytes:
+            return result
+
+        with self._lock:
+            if text not in self._cache:
+                self._cache[text] = result
+                self._bytes += size
+            while len(self._cache) > self.max_entries or self._bytes > self.max_bytes:
+                old_text, old_result = self._cache.popitem(last=False)
+                self._bytes -= sys.getsizeof(old_text) + sys.getsizeof(old_result)
+        return result
+
+    def stats(self):
+        """Returns the hit and miss counters and the current size of the cache."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self._cache),
+            "bytes": self._bytes,
+        }
+
+    def clear(self):
+        """Empties the cache and resets the counters."""
+        with self._lock:
+            self._cache.clear()
+            self._bytes = 0
+            self.hits = self.misses = 0
@@ -1,6 +1,10 @@
+import re
+import codecs
 from lxml import etree
 from bs4 import BeautifulSoup
-import requests
+from bs4.dammit import EncodingDetector
+from WebScrapingFundamentals.src.SessionPool import SessionPool
+from WebScrapingFundamentals.src.html_parsing.SelectorRegistry import SelectorRegistry
 
 
 class XPathHTMLParser:
@@ -8,18 +12,58 @@ class XPathHTMLParser:
 
     def __init__(self, url):
         self.url = url
-        response = requests.get(url, headers={"User-Agent": "Mozilla/5.0"})
-        self.soup = BeautifulSoup(response.text, "lxml")
-        self.dom = etree.HTML(str(self.soup))  # Convert to lxml etree
+        response = SessionPool.default().request("GET", url, headers={"User-Agent": "Mozilla/5.0"})
+        self.content = response.content
+        self.encoding = self.detect_encoding(self.content, response.headers.get("Content-Type"))
+
+        # The lxml tree is built straight from the bytes, the soup only when someone asks for it
+        self.dom = etree.HTML(self.content, etree.HTMLParser(encoding=self.encoding))
+        self._soup = None
+        self.selectors = SelectorRegistry.default()
+
+    @property
+    def soup(self):
+        """BeautifulSoup document of the page, parsed on first access."""
+        if self._soup is None:
+            self._soup = BeautifulSoup(self.content, "lxml", from_encoding=self.encoding)
+        return self._soup
+
+    @staticmethod
+    def detect_encoding(content, content_type=None):
+        """
+        Returns the charset from the Content-Type header, the document's <meta> tag, or guesses it.
+        A charset Python does not know (e.g. "none", "x-user-defined" or a misspelling) is skipped.
+        """
+        match = re.search(r"charset=[\"']?([\w.:-]+)", content_type or "", re.IGNORECASE)
+        if match and XPathHTMLParser._is_known_encoding(match.group(1)):
+            return match.group(1)
+
+        declared = EncodingDetector.find_declared_encoding(content, is_html=True)
+        if declared and XPathHTMLParser._is_known_encoding(declared):
+            return declared
+
+        try:
+            content.decode("utf-8")
+            return "utf-8"
+        except UnicodeDecodeError:
+            return "windows-1252"
+
+    @staticmethod
+    def _is_known_encoding(encoding):
+        try:
+            codecs.lookup(encoding)
+            return True
+        except LookupError:
+            return False
 
     def get_element(self, xpath):
         """Returns the first matching element for the given XPath expression."""
-        result = self.dom.xpath(xpath)
+        result = self.selectors.xpath(xpath)(self.dom)
         return result[0] if result else None
 
     def get_elements(self, xpath):
         """Returns all matching elements for the given XPath expression."""
-        return self.dom.xpath(xpath)
+        return self.selectors.xpath(xpath)(self.dom)
 
     def get_text(self, xpath):
         """Returns text content of the first matching element."""
@@ -33,4 +77,8 @@ class XPathHTMLParser:
 
     def get_links(self, xpath="//a/@href"):
         """Returns all href links found by the given XPath expression."""
-        return self.dom.xpath(xpath)
+        return self.selectors.xpath(xpath)(self.dom)
+
+    def get_fields(self, fields, many=False):
+        """Returns the text of many fields at once, given as {field name: XPath expression}."""
+        return self.selectors.extract_xpath(self.dom, fields, many)
@@ -1,84 +1,131 @@
 import os
 import csv
 import json
-import requests
 import logging
+import requests
+from concurrent.futures import ThreadPoolExecutor
 from bs4 import BeautifulSoup
 from WebScrapingFundamentals.src.HTTPRequest import HTTPRequest
+from WebScrapingFundamentals.src.SessionPool import SessionPool
+from WebScrapingFundamentals.src.QueueLogging import setup_logging, PRODUCT
+from WebScrapingFundamentals.src.scraper.ProductSink import ProductSink
 
 
-# Configuring the Logging system
-logging.basicConfig(
-    filename="src/scraper/logs/scraper.log",
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s",
-)
-console_handler = logging.StreamHandler()
-console_handler.setLevel(logging.INFO)
-logging.getLogger().addHandler(console_handler)
+# Configuring the Logging system, records are written to the file and the console by a background thread
+setup_logging("src/scraper/logs/scraper.log")
 
 
 class ECommerceScraper:
     """ Scraping the multi-page E-commerce website, with functionality to download images by the product name """
-    def __init__(self, url="https://scrapeme.live/shop/", number_of_pages=1):
+    def __init__(self, url="https://scrapeme.live/shop/", number_of_pages=1, workers=1, cache=None):
         self.url = url
         self.number_of_pages = number_of_pages
+        self.workers = workers
+        self.failed_pages = {}
+        self.session_pool = SessionPool(pool_maxsize=max(10, workers))  # One kept-alive connection per worker
+        self.cache = cache  # Optional ResponseCache, unchanged pages are neither downloaded nor parsed again
         self.products_csv_path = "src/scraper/datasets/products.csv"
         self.products_json_path = "src/scraper/datasets/products.json"
+        self.fieldnames = ["Image URL", "Name", "Price"]
         self.image_folder = "src/scraper/image_folder"
+        self.image_manifest_path = os.path.join(self.image_folder, "manifest.json")
+        self._image_index = {}
+        self._image_index_version = None
 
         os.makedirs(self.image_folder, exist_ok=True)  # Ensure image folder exists
 
-    def scrape_products(self):
-        """Scrape product data from multiple pages."""
-        product_list = []
-        page_number = 1
+    def scrape_products(self, workers=None):
+        """
+        Scrape product data from multiple pages, appending each page to the CSV and JSON files as it finishes.
 
-        while page_number <= self.number_of_pages:
-            url = f"{self.url}page/{page_number}/"
-            logging.info(f"📌 Scraping page {page_number}: {url}")
+        :param workers: (Optional) Number of pages fetched and parsed at once, defaults to self.workers.
+                        Results are merged back in page order; failed pages are kept in self.failed_pages.
+        """
+        self.failed_pages = {}
 
-            try:
-                response = HTTPRequest(url).http_method("GET")
-                soup = BeautifulSoup(response, "html.parser") if response else None
+        with ProductSink(self.products_csv_path, self.products_json_path, self.fieldnames) as sink:
+            for page_number, products in self._iter_pages(workers or self.workers):
+                if products is None:
+                    logging.warning("⚠️ No products found on page %s.", page_number)
+                    break
 
-                products = (soup.find("div", id="page").find("div", id="content")
-                            .find("main").find("ul", class_="products columns-4"))
+                sink.write_page(products)  # Each page is written once, as soon as the pages before it are
 
-                if not products:
-                    logging.warning(f"⚠️ No products found on page {page_number}.")
-                    break
+        if self.failed_pages:
+            logging.warning("⚠️ Failed pages: %s", sorted(self.failed_pages))
 
-                for product in products.find_all("li"):
-                    a = product.find("a")
-                    prod_img = a.find("img")['src']
-                    prod_name = a.find("h2").text.strip()
-                    prod_price = a.find("span", class_="price").find("span").text.strip()
+    def _iter_pages(self, workers):
+        """Yields (page number, products) in page order, scraping up to `workers` pages at once."""
+        page_numbers = range(1, self.number_of_pages + 1)
 
-                    product_data = {"Image URL": prod_img, "Name": prod_name, "Price": prod_price}
-                    product_list.append(product_data)
-                    logging.info(f"✅ Scraped: {prod_name} - {prod_price}")
+        if workers <= 1:
+            for page_number in page_numbers:
+                yield page_number, self._scrape_page_safely(page_number)
+            return
 
-                self.save_to_csv(product_list)
-                self.save_to_json(product_list)
+        executor = ThreadPoolExecutor(max_workers=workers)
+        try:
+            yield from zip(page_numbers, executor.map(self._scrape_page_safely, page_numbers))
+        finally:
+            executor.shutdown(cancel_futures=True)  # Pages past an empty one are not needed
 
-            except Exception as e:
-                logging.error(f"❌ Error scraping page {page_number}: {e}")
+    def _scrape_page_safely(self, page_number):
+        """Scrapes a page, recording the error and returning no products if it fails."""
+        try:
+            return self._scrape_page(page_number)
+        except Exception as e:
+            logging.error("❌ Error scraping page %s: %s", page_number, e)
+            self.failed_pages[page_number] = str(e)
+            return []
+
+    def _scrape_page(self, page_number):
+        """Scrapes a single page, returns its products or None if the page has no products."""
+        url = f"{self.url}page/{page_number}/"
+        logging.info("📌 Scraping page %s: %s", page_number, url)
+
+        request = HTTPRequest(url, session_pool=self.session_pool, cache=self.cache)
+        response = request.http_method("GET")
+
+        if request.not_modified:
+            cached_products = self.cache.annotation("GET", url, "products")
+            if cached_products is not None:
+                logging.info("⏭️ Page %s not modified, reusing %s products", page_number, len(cached_products))
+                return cached_products
 
-            page_number += 1
+        soup = BeautifulSoup(response, "html.parser") if response else None
+
+        products = (soup.find("div", id="page").find("div", id="content")
+                    .find("main").find("ul", class_="products columns-4"))
+
+        if not products:
+            return None
+
+        product_list = []
+        for product in products.find_all("li"):
+            a = product.find("a")
+            prod_img = a.find("img")['src']
+            prod_name = a.find("h2").text.strip()
+            prod_price = a.find("span", class_="price").find("span").text.strip()
+
+            product_data = {"Image URL": prod_img, "Name": prod_name, "Price": prod_price}
+            product_list.append(product_data)
+            logging.log(PRODUCT, "✅ Scraped: %s - %s", prod_name, prod_price)
+
+        if self.cache is not None:
+            self.cache.annotate("GET", url, "products", product_list)
+        return product_list
 
     def save_to_csv(self, product_list):
         """Save product data to a CSV file."""
         try:
             with open(self.products_csv_path, mode="w", newline="", encoding="utf-8") as csv_file:
-                fieldnames = ["Image URL", "Name", "Price"]
-                writer = csv.DictWriter(csv_file, fieldnames=fieldnames)
+                writer = csv.DictWriter(csv_file, fieldnames=self.fieldnames)
                 writer.writeheader()
                 writer.writerows(product_list)
 
-            logging.info(f"✅ Data saved to CSV: {self.products_csv_path}")
+            logging.info("✅ Data saved to CSV: %s", self.products_csv_path)
         except Exception as e:
-            logging.error(f"❌ Failed to save CSV: {e}")
+            logging.error("❌ Failed to save CSV: %s", e)
 
     def save_to_json(self, product_list):
         """Save product data to a JSON file."""
@@ -86,31 +133,153 @@ class ECommerceScraper:
             with open(self.products_json_path, mode="w", encoding="utf-8") as json_file:
                 json.dump(product_list, json_file, indent=4, ensure_ascii=False)
 
-            logging.info(f"✅ Data saved to JSON: {self.products_json_path}")
+            logging.info("✅ Data saved to JSON: %s", self.products_json_path)
         except Exception as e:
-            logging.error(f"❌ Failed to save JSON: {e}")
+            logging.error("❌ Failed to save JSON: %s", e)
 
     def download_image(self, prod_name):
         """Download product image using name of the product from CSV file."""
-        image_filename = os.path.join(self.image_folder, f"{prod_name}.jpg")
+        try:
+            image_index = self._load_image_index()
+            if prod_name.lower() not in image_index:
+                logging.warning("⚠️ Product '%s' not found in CSV.", prod_name)
+                return
+
+            manifest = self._load_image_manifest()
+            self._download_image(prod_name, image_index[prod_name.lower()][1], manifest)
+            self._save_image_manifest(manifest)
+
+        except Exception as e:
+            logging.error("❌ Failed to download image for '%s': %s", prod_name, e)
+
+    def download_images(self, prod_names="all", workers=8, chunk_size=64 * 1024):
+        """
+        Download images of many products at once, skipping images that are already on disk.
+
+        :param prod_names: List of product names, or "all" for every product in the CSV file
+        :param workers: Number of images downloaded at once
+        :param chunk_size: Size of the streaming buffer in bytes
+        :return: Dictionary with the number of downloaded, skipped and failed images
+        """
+        summary = {"downloaded": 0, "skipped": 0, "failed": 0}
 
         try:
-            with open(self.products_csv_path, mode="r", encoding="utf-8") as csv_file:
-                reader = csv.DictReader(csv_file)
-                for row in reader:
-                    if row["Name"].lower() == prod_name.lower():
-                        prod_img = row["Image URL"]
-                        break
+            image_index = self._load_image_index()
+        except Exception as e:
+            logging.error("❌ Failed to read products for image download: %s", e)
+            return summary
+
+        if prod_names == "all":
+            targets = list(image_index.values())
+        else:
+            targets = []
+            for prod_name in prod_names:
+                if prod_name.lower() in image_index:
+                    targets.append((prod_name, image_index[prod_name.lower()][1]))
                 else:
-                    logging.warning(f"⚠️ Product '{prod_name}' not found in CSV.")
-                    return
+                    logging.warning("⚠️ Product '%s' not found in CSV.", prod_name)
 
-            img_data = requests.get(prod_img, stream=True, verify=False)  # Disabling SSL verification
-            with open(image_filename, "wb") as img_file:
-                for chunk in img_data.iter_content(1024):
-                    img_file.write(chunk)
+        manifest = self._load_image_manifest()
+
+        def download(target):
+            prod_name, prod_img = target
+            try:
+                return self._download_image(prod_name, prod_img, manifest, chunk_size)
+            except Exception as e:
+                logging.error("❌ Failed to download image for '%s': %s", prod_name, e)
+                return "failed"
 
-            logging.info(f"✅ Downloaded image: {image_filename}")
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for result in executor.map(download, targets):
+                summary[result] += 1
 
+        self._save_image_manifest(manifest)
+        logging.info("✅ Image download finished: %s", summary)
+        return summary
+
+    def _load_image_index(self):
+        """Returns {lowercase name: (name, image url)} for the CSV file, re-reading it only when it changes."""
+        stat = os.stat(self.products_csv_path)
+        version = (stat.st_mtime_ns, stat.st_size)
+
+        if self._image_index_version != version:
+            image_index = {}
+            with open(self.products_csv_path, mode="r", encoding="utf-8") as csv_file:
+                for row in csv.DictReader(csv_file):
+                    image_index.setdefault(row["Name"].lower(), (row["Name"], row["Image URL"]))
+            self._image_index = image_index
+            self._image_index_version = version
+
+        return self._image_index
+
+    def _load_image_manifest(self):
+        """Returns {image file name: {"etag", "size"}} recorded by previous downloads."""
+        try:
+            with open(self.image_manifest_path, mode="r", encoding="utf-8") as manifest_file:
+                return json.load(manifest_file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _save_image_manifest(self, manifest):
+        """Saves the manifest of downloaded images."""
+        try:
+            with open(self.image_manifest_path, mode="w", encoding="utf-8") as manifest_file:
+                json.dump(manifest, manifest_file, indent=4, ensure_ascii=False)
         except Exception as e:
-            logging.error(f"❌ Failed to download image for '{prod_name}': {e}")
+            logging.error("❌ Failed to save image manifest: %s", e)
+
+    def _download_image(self, prod_name, prod_img, manifest, chunk_size=64 * 1024):
+        """
+        Downloads one image unless the copy on disk is current, returns "downloaded" or "skipped".
+
+        An image is current when the server answers 304 to its recorded ETag or, for images without a
+        recorded ETag, when a HEAD request reports a Content-Length equal to its size on disk. The image
+        is only requested with GET when it has to be downloaded.
+        """
+        file_name = f"{prod_name}.jpg"
+        image_filename = os.path.join(self.image_folder, file_name)
+        on_disk = os.path.isfile(image_filename)
+        recorded = manifest.get(file_name, {}) if on_disk else {}
+
+        if on_disk and not recorded.get("etag"):
+            head = self._head_image(prod_img)
+            if head is not None:
+                content_length = head.headers.get("Content-Length")
+                if (content_length is not None and "Content-Encoding" not in head.headers
+                        and int(content_length) == os.path.getsize(image_filename)):
+                    manifest[file_name] = {"etag": head.headers.get("ETag"), "size": int(content_length)}
+                    logging.info("⏭️ Image is up to date: %s", image_filename)
+                    return "skipped"
+
+        headers = {"If-None-Match": recorded["etag"]} if recorded.get("etag") else {}
+        # Disabling SSL verification
+        with self.session_pool.request("GET", prod_img, headers=headers, stream=True, verify=False) as img_data:
+            if img_data.status_code == 304:
+                _ = img_data.content  # Reads the empty body, so closing the response keeps the connection
+                logging.info("⏭️ Image is up to date: %s", image_filename)
+                return "skipped"
+
+            img_data.raise_for_status()
+            etag = img_data.headers.get("ETag")
+
+            temp_filename = image_filename + ".part"
+            size = 0
+            with open(temp_filename, "wb") as img_file:
+                for chunk in img_data.iter_content(chunk_size):
+                    img_file.write(chunk)
+                    size += len(chunk)
+            os.replace(temp_filename, image_filename)  # A failed download never replaces a good image
+
+        manifest[file_name] = {"etag": etag, "size": size}
+        logging.info("✅ Downloaded image: %s", image_filename)
+        return "downloaded"
+
+    def _head_image(self, prod_img):
+        """Returns the response to a HEAD request for the image, or None when the server does not answer it."""
+        try:
+            # Disabling SSL verification
+            response = self.session_pool.request("HEAD", prod_img, verify=False)
+        except requests.RequestException as e:
+            logging.warning("⚠️ HEAD request failed for image %s: %s", prod_img, e)
+            return None
+        return response if response.ok else None
@@ -0,0 +1,132 @@
+import io
+import os
+import csv
+import json
+import logging
+
+
+class ProductSink:
+    """
+    Writes scraped products page by page instead of rewriting whole files after every page.
+
+    Each page's rows are appended to a temporary CSV file and to a JSON-lines file next to the JSON
+    file. Files are flushed and fsynced every `checkpoint_every` pages. On close the temporary CSV file
+    replaces the CSV file and the JSON-lines file is streamed into the JSON file as a regular JSON
+    array, so the outputs of the previous run are only replaced by a complete run.
+    """
+    def __init__(self, csv_path, json_path, fieldnames, checkpoint_every=10):
+        self.csv_path = csv_path
+        self.json_path = json_path
+        self.jsonl_path = os.path.splitext(json_path)[0] + ".jsonl"
+        self.csv_temp_path = csv_path + ".tmp"
+        self.fieldnames = fieldnames
+        self.checkpoint_every = checkpoint_every
+        self.pages_written = 0
+        self.rows_written = 0
+        self._csv_file = None
+        self._jsonl_file = None
+        self._writer = None
+        self._page_buffer = io.StringIO()  # CSV text of the page being written
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close(replace=exc_type is None)
+
+    def open(self):
+        """Creates the temporary output files and writes the CSV header."""
+        self._csv_file = open(self.csv_temp_path, mode="w", newline="", encoding="utf-8")
+        self._jsonl_file = open(self.jsonl_path, mode="w", encoding="utf-8")
+        self._writer = csv.DictWriter(self._page_buffer, fieldnames=self.fieldnames)
+        self._writer.writeheader()
+        self._csv_file.write(self._take_page_buffer())
+
+    def _take_page_buffer(self):
+        text = self._page_buffer.getvalue()
+        self._page_buffer.seek(0)
+        self._page_buffer.truncate()
+        return text
+
+    def write_page(self, product_list):
+        """
+        Appends one page of products to the CSV and JSON-lines files.
+
+        The page is serialized for both files before either is written, so a page that can not be
+        serialized (e.g. an unknown field) is logged and left out of both. Errors writing the files
+        are logged and raised.
+        """
+        try:
+            self._writer.writerows(product_list)
+            csv_text = self._take_page_buffer()
+            jsonl_text = "".join(json.dumps(product, ensure_ascii=False) + "\n" for product in product_list)
+        except Exception as e:
+            self._take_page_buffer()
+            logging.error("❌ Failed to save page of products, skipped in both files: %s", e)
+            return
+
+        try:
+            self._csv_file.write(csv_text)
+            self._jsonl_file.write(jsonl_text)
+            self.rows_written += len(product_list)
+            self.pages_written += 1
+
+            if self.pages_written % self.checkpoint_every == 0:
+                self.checkpoint()
+        except Exception as e:
+            logging.error("❌ Failed to save page of products: %s", e)
+            raise
+
+    def checkpoint(self):
+        """Flushes both files to disk, so an interrupted crawl keeps every page written so far."""
+        for file in (self._csv_file, self._jsonl_file):
+            file.flush()
+            os.fsync(file.fileno())
+
+    def close(self, replace=True):
+        """
+        Flushes and closes the files, then replaces the CSV file and finalizes the JSON array.
+
+        :param replace: Whether the outputs are replaced. When False (the crawl failed), the previous
+                        outputs are kept and the pages written so far stay in the temporary files.
+        """
+        if self._csv_file is None:
+            return
+
+        try:
+            self.checkpoint()
+            self._csv_file.close()
+            self._jsonl_file.close()
+            if not replace:
+                logging.warning("⚠️ Crawl interrupted, previous outputs kept. Pages written so far: %s, %s",
+                                self.csv_temp_path, self.jsonl_path)
+                return
+
+            os.replace(self.csv_temp_path, self.csv_path)
+            logging.info("✅ Data saved to CSV: %s", self.csv_path)
+
+            self._finalize_json()
+            logging.info("✅ Data saved to JSON: %s", self.json_path)
+        except Exception as e:
+            logging.error("❌ Failed to finalize product files: %s", e)
+        finally:
+            self._csv_file = self._jsonl_file = self._writer = None
+
+    def _finalize_json(self):
+        """Streams the JSON-lines file into a JSON array formatted like json.dump(indent=4)."""
+        temp_path = self.json_path + ".tmp"
+
+        with open(self.jsonl_path, mode="r", encoding="utf-8") as jsonl_file, \
+                open(temp_path, mode="w", encoding="utf-8") as json_file:
+            json_file.write("[")
+            separator = "\n"
+            for line in jsonl_file:
+                item = json.dumps(json.loads(line), indent=4, ensure_ascii=False)
+                json_file.write(separator + "    " + item.replace("\n", "\n    "))
+                separator = ",\n"
+            json_file.write("\n]" if separator == ",\n" else "]")
+            json_file.flush()
+            os.fsync(json_file.fileno())
+
+        os.replace(temp_path, self.json_path)  # Readers never see a half-written array